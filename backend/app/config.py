@@ -3,7 +3,8 @@ Application configuration using Pydantic Settings.
 Loads from environment variables with validation.
 """
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from functools import cached_property
+from typing import FrozenSet, List, Optional
 
 
 class Settings(BaseSettings):
@@ -16,6 +17,22 @@ class Settings(BaseSettings):
     qdrant_url: str
     qdrant_api_key: str
     qdrant_collection_name: str = "rag_3072"
+    qdrant_prefer_grpc: bool = True  # protobuf over HTTP/2 instead of JSON
+    qdrant_grpc_port: int = 6334
+    qdrant_scalar_quantization: bool = True  # int8 quantized vectors for new collections
+    qdrant_binary_quantization: bool = False  # 1-bit quantization instead of int8 (best for 1024+ dims)
+    qdrant_float16_vectors: bool = True  # Store original vectors as float16 in new collections
+    qdrant_vectors_on_disk: bool = True  # Keep originals on disk; search uses in-RAM int8 copies
+    qdrant_rescore_oversampling: float = 2.0  # Quantized candidates fetched per result before rescoring
+    qdrant_hnsw_m: int = 16  # HNSW graph degree for new collections
+    qdrant_hnsw_ef_construct: int = 200  # HNSW build-time candidate list for new collections
+    qdrant_hnsw_ef: Optional[int] = None  # Fixed HNSW ef for search (default: adaptive, see below)
+    qdrant_hnsw_ef_multiplier: int = 4  # Adaptive search ef = max(64, multiplier * top_k)
+    qdrant_upsert_batch_size: int = 256  # Points per upload request
+    qdrant_upsert_parallel: int = 4  # Upsert requests in flight (threads) when a document spans several batches
+    qdrant_bulk_min_points: int = 2000  # Pause HNSW indexing for uploads at least this large
+    qdrant_indexing_threshold: int = 20000  # KB; restored after a bulk upload (Qdrant's default)
+    chunk_text_store_path: Optional[str] = None  # SQLite file for chunk text instead of the Qdrant payload (unset = keep in Qdrant)
     
     # Cohere Configuration (for reranking)
     cohere_api_key: str
@@ -24,14 +41,27 @@ class Settings(BaseSettings):
     environment: str = "development"
     chunk_size: int = 1000
     chunk_overlap: int = 120
+    ingestion_workers: int = 1  # Processes for parsing/chunking multi-file uploads (1 = inline)
+    ingestion_parallel_min_bytes: int = 8_000_000  # Batches smaller than this are parsed inline
     top_k_retrieval: int = 15
     top_k_rerank: int = 5
     chat_history_turns: int = 3
     
+    # Semantic answer cache
+    semantic_cache_size: int = 1024
+    semantic_cache_threshold: float = 0.97  # Cosine similarity for a cache hit
+    rerank_cache_size: int = 512  # LRU entries for Cohere rerank results
+    
     # LLM Settings
     llm_model: str = "gemini-2.5-flash"  # Gemini 2.5 Flash
     embedding_model: str = "models/text-embedding-004"  # Gemini embedding model
     embedding_dimension: int = 768  # Gemini embeddings are 3072-dimensional
+    embedding_output_dimension: Optional[int] = None  # Truncate (Matryoshka) and renormalize to this many dims; needs a new collection
+    query_embedding_cache_size: int = 2048  # LRU entries for query embeddings
+    embed_batch_wait_ms: int = 8  # Window for coalescing small concurrent embed batches (0 = off)
+    embed_rpm_limit: int = 0  # Gemini embed requests per minute to pace to (0 = unlimited)
+    embed_tpm_limit: int = 0  # Gemini embed input tokens per minute to pace to (0 = unlimited)
+    embedding_cache_path: Optional[str] = None  # SQLite file caching embeddings across runs (unset = off)
     
     # CORS Settings
     allowed_origins: str = "http://localhost:5173,http://localhost:3000"
@@ -56,6 +86,16 @@ class Settings(BaseSettings):
         """Parse comma-separated origins into a list."""
         return [origin.strip() for origin in self.allowed_origins.split(",")]
     
+    @cached_property
+    def allowed_file_types_set(self) -> FrozenSet[str]:
+        """Allowed extensions as a frozenset for O(1) membership checks."""
+        return frozenset(self.allowed_file_types)
+    
+    @property
+    def vector_dimension(self) -> int:
+        """Dimension of the vectors stored in and searched against Qdrant."""
+        return self.embedding_output_dimension or self.embedding_dimension
+    
     @property
     def max_file_size_bytes(self) -> int:
         """Convert MB to bytes."""
@@ -64,5 +104,3 @@ class Settings(BaseSettings):
 
 # Global settings instance
 settings = Settings()
-print("🔥 EMBEDDING_MODEL =", settings.embedding_model)
-print("🔥 EMBEDDING_DIMENSION =", settings.embedding_dimension)
@@ -3,11 +3,24 @@ FastAPI application entry point.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
 import logging
 
 from app.config import settings
 from app.models.schemas import HealthResponse
+from app.routes import documents, chat
+from app.services.embeddings import get_embedding_service
+from app.services.ingestion import get_ingestion_service
+from app.services.llm import get_llm_service
+from app.services.retrieval import close_retrieval_service, get_retrieval_service
+from app.services.vectorstore import (
+    close_async_qdrant_client,
+    close_qdrant_client,
+    get_vectorstore_service,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -28,13 +41,34 @@ async def lifespan(app: FastAPI):
     logger.info(f"Vector DB: {settings.qdrant_url}")
     logger.info(f"Collection: {settings.qdrant_collection_name}")
     
-    # TODO: Initialize Qdrant connection here in future steps
-    # TODO: Verify OpenAI API key
+    # Warm up heavy services so the first query doesn't pay SDK/TLS init
+    try:
+        await asyncio.gather(
+            asyncio.to_thread(get_embedding_service),
+            asyncio.to_thread(get_llm_service),
+            asyncio.to_thread(get_vectorstore_service),
+        )
+        # Retrieval and ingestion reuse the services above, so build them afterwards
+        await asyncio.gather(
+            asyncio.to_thread(get_retrieval_service),
+            asyncio.to_thread(get_ingestion_service),
+        )
+        # Migrate points stored before source_id, so per-document deletes
+        # and re-ingestion match them
+        await asyncio.to_thread(get_vectorstore_service().backfill_source_ids)
+        # Page in the collection's mmap'd indexes before the first query
+        await asyncio.to_thread(get_vectorstore_service().warmup)
+        logger.info("✓ Services preloaded")
+    except Exception as e:
+        logger.warning(f"Service preload failed, falling back to lazy init: {e}")
     
     yield
     
     # Shutdown
     logger.info("👋 Shutting down RAG application...")
+    await close_retrieval_service()
+    await close_async_qdrant_client()
+    close_qdrant_client()
 
 
 # Create FastAPI app
@@ -42,7 +76,8 @@ app = FastAPI(
     title="RAG Application API",
     description="Retrieval-Augmented Generation with multi-turn chat and citations",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -60,19 +95,29 @@ app.add_middleware(
 # HEALTH CHECK ENDPOINT
 # ============================================================================
 
+# Static part of the health payload, built once instead of per probe
+_HEALTH_STATUS = {
+    "status": "healthy",
+    "qdrant_connected": False,  # Will implement in next step
+    "openai_configured": bool(settings.google_api_key),  # Using Gemini instead
+    "cohere_configured": bool(settings.cohere_api_key),
+}
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
     Health check endpoint to verify service status.
+    
+    Returns a prebuilt payload directly, skipping Pydantic validation on
+    this frequently probed endpoint.
     """
     # Basic health check
     # In future steps, we'll add actual connection checks
-    return HealthResponse(
-        status="healthy",
-        qdrant_connected=False,  # Will implement in next step
-        openai_configured=bool(settings.google_api_key),  # Using Gemini instead
-        cohere_configured=bool(settings.cohere_api_key)
-    )
+    return ORJSONResponse({
+        **_HEALTH_STATUS,
+        "timestamp": datetime.utcnow().isoformat()
+    })
 
 
 @app.get("/")
@@ -86,19 +131,22 @@ async def root():
 
 
 # ============================================================================
-# IMPORT ROUTES
+# ROUTES
 # ============================================================================
 
-from app.routes import documents, chat
 app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=True,
+        # uvloop is not available on Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
@@ -4,6 +4,7 @@ Pydantic models for API request/response validation.
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from functools import cached_property
 
 
 # ============================================================================
@@ -113,6 +114,7 @@ class RetrievedChunk(BaseModel):
     text: str
     score: float
     metadata: ChunkMetadata
+    point_id: str = ""  # Qdrant point ID; unique even where chunk_id is not
 
 
 class RerankedChunk(BaseModel):
@@ -122,6 +124,19 @@ class RerankedChunk(BaseModel):
     score: float  # Reranker score
     original_score: float  # Original vector similarity
     metadata: ChunkMetadata
+    
+    # Display strings for prompts and citations, formatted once per chunk
+    @cached_property
+    def text_preview(self) -> str:
+        return self.text[:200] + "..." if len(self.text) > 200 else self.text
+    
+    @cached_property
+    def links_str(self) -> str:
+        return ", ".join(self.metadata.links) if self.metadata.links else "None"
+    
+    @cached_property
+    def images_str(self) -> str:
+        return ", ".join(self.metadata.images) if self.metadata.images else "None"
 
 
 # ============================================================================
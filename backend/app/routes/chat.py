@@ -1,39 +1,36 @@
 """
 API routes for chat and query handling.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Dict, Optional
+import json
 import logging
 import time
 
-# Add these imports for the reset endpoint
-from qdrant_client import QdrantClient, models
+from qdrant_client import QdrantClient
+from qdrant_client.models import Filter, FilterSelector
 
 from app.models.schemas import QueryRequest, QueryResponse, TimingInfo
-from app.services.retrieval import get_retrieval_service
+from app.services.retrieval import RetrievalService, get_retrieval_service
 from app.services.llm import get_llm_service
+from app.services.chunk_store import get_chunk_text_store
+from app.services.embeddings import get_embedding_service
+from app.services.vectorstore import get_qdrant_client
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-"""
-Simplified reset endpoint that avoids Pydantic validation errors.
-Replace your current /reset endpoint in app/routes/chat.py with this.
 
-This version skips the get_collection() call that's causing the Pydantic error.
-"""
 @router.post("/reset")
-async def reset_vector_database():
+async def reset_vector_database(client: QdrantClient = Depends(get_qdrant_client)):
     """
     Clear all vectors from the existing Qdrant collection.
     Safe for Qdrant Cloud. Does NOT recreate the collection.
     """
     try:
-        from qdrant_client import QdrantClient
-        from qdrant_client.models import Filter
-        from app.config import settings
-
         # Optional safety guard
         if settings.environment != "development":
             raise HTTPException(
@@ -41,22 +38,28 @@ async def reset_vector_database():
                 detail="Vector reset is disabled outside development environment"
             )
 
-        client = QdrantClient(
-            url=settings.qdrant_url,
-            api_key=settings.qdrant_api_key
-        )
-
         collection_name = settings.qdrant_collection_name
 
         # 🔥 THIS is the key line — delete ALL points safely
+        # wait=False: Qdrant acks immediately and deletes in the background
         result = client.delete(
             collection_name=collection_name,
-            points_selector=Filter()  # empty filter = delete all
+            points_selector=FilterSelector(filter=Filter()),  # empty filter = delete all
+            wait=False
         )
 
+        # Chunk texts kept outside Qdrant would otherwise be orphaned
+        text_store = get_chunk_text_store()
+        if text_store is not None:
+            text_store.clear()
+
+        # Cached answers and sources refer to the deleted documents
+        get_embedding_service().clear_query_cache()
+        get_retrieval_service().clear_answer_cache()
+
         return {
             "status": "success",
-            "message": "Vector database cleared",
+            "message": "Vector database clear scheduled",
             "operation_id": result.operation_id
         }
 
@@ -68,7 +71,7 @@ async def reset_vector_database():
 
 # Alternative: Debug endpoint that ALSO skips get_collection()
 @router.get("/debug/qdrant-simple")
-async def debug_qdrant_simple():
+async def debug_qdrant_simple(client: QdrantClient = Depends(get_qdrant_client)):
     """
     Simplified debug endpoint that avoids get_collection() call.
     """
@@ -76,15 +79,8 @@ async def debug_qdrant_simple():
         if not settings.qdrant_api_key:
             return {"error": "QDRANT_API_KEY not configured"}
         
-        qdrant_client = QdrantClient(
-            url=settings.qdrant_url,
-            api_key=settings.qdrant_api_key,
-            timeout=60,
-            prefer_grpc=False
-        )
-        
         # Only list collections (this works fine)
-        collections = qdrant_client.get_collections()
+        collections = client.get_collections()
         collection_names = [c.name for c in collections.collections]
         
         return {
@@ -102,7 +98,99 @@ async def debug_qdrant_simple():
             "error": str(e),
             "connection_status": "failed"
         }
-        
+
+
+@router.post("/cache/clear")
+async def clear_caches():
+    """
+    Clear cached query embeddings and answers (e.g. after changing the
+    embedding model).
+    """
+    get_embedding_service().clear_query_cache()
+    get_retrieval_service().clear_answer_cache()
+    return {
+        "status": "success",
+        "message": "Query embedding and answer caches cleared"
+    }
+
+
+def _sse(event: str, data: str) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _build_timing(
+    retrieval_timing: Dict[str, float],
+    llm_timing: Dict[str, float],
+    overall_start: float
+) -> TimingInfo:
+    """Combine per-stage timings with the total elapsed time."""
+    return TimingInfo(
+        retrieval_ms=retrieval_timing.get('retrieval_ms', 0),
+        rerank_ms=retrieval_timing.get('rerank_ms', 0),
+        llm_ms=llm_timing.get('llm_ms', 0),
+        total_ms=(time.time() - overall_start) * 1000
+    )
+
+
+async def _get_cached_response(
+    retrieval_service: RetrievalService,
+    request: QueryRequest,
+    overall_start: float
+) -> Optional[QueryResponse]:
+    """Return a cached response for a standalone query, or None on miss."""
+    # Answers depend on chat history, so only standalone queries use the cache
+    if request.chat_history:
+        return None
+    
+    cached = await retrieval_service.get_cached_answer(request.query)
+    if cached is None:
+        return None
+    
+    timing = _build_timing({}, {}, overall_start)
+    logger.info("✓ Semantic cache hit: %.0fms total", timing.total_ms)
+    
+    return QueryResponse(**cached, timing=timing, session_id=request.session_id)
+
+
+async def _general_answer_response(
+    request: QueryRequest,
+    retrieval_timing: Dict[str, float],
+    overall_start: float
+) -> QueryResponse:
+    """Answer from general knowledge when no relevant context was found."""
+    logger.warning("No relevant context found - generating general answer")
+    
+    general_answer, llm_timing = await get_llm_service().generate_general_answer(request.query)
+    
+    return QueryResponse(
+        answer="I don't have information about this in the uploaded documents.",
+        sources=[],
+        has_context=False,
+        general_answer=general_answer,
+        timing=_build_timing(retrieval_timing, llm_timing, overall_start),
+        token_usage=None,
+        session_id=request.session_id
+    )
+
+
+def _cache_answer(
+    retrieval_service: RetrievalService,
+    request: QueryRequest,
+    response: QueryResponse
+) -> None:
+    """Cache a grounded answer for future standalone queries."""
+    if request.chat_history:
+        return
+    
+    retrieval_service.cache_answer(request.query, {
+        "answer": response.answer,
+        "sources": response.sources,
+        "has_context": True,
+        "token_usage": response.token_usage
+    })
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query(request: QueryRequest):
     """
@@ -123,74 +211,131 @@ async def query(request: QueryRequest):
     overall_start = time.time()
     
     try:
-        logger.info(f"Processing query: '{request.query[:50]}...'")
+        logger.info("Processing query: '%s...'", request.query[:50])
         
-        # Step 1 & 2: Retrieve and rerank
         retrieval_service = get_retrieval_service()
         
-        reranked_chunks, retrieval_timing = retrieval_service.retrieve_and_rerank(
+        cached_response = await _get_cached_response(retrieval_service, request, overall_start)
+        if cached_response is not None:
+            return cached_response
+        
+        # Step 1 & 2: Retrieve and rerank
+        reranked_chunks, retrieval_timing = await retrieval_service.retrieve_and_rerank(
             query=request.query
         )
         
         # Step 3: Check if we have relevant context
-        has_relevant_context = retrieval_service.check_context_relevance(reranked_chunks)
-        
-        llm_service = get_llm_service()
-        
-        if not has_relevant_context:
-            # No relevant context found
-            logger.warning("No relevant context found - generating general answer")
-            
-            # Generate general knowledge answer
-            general_answer, llm_timing = llm_service.generate_general_answer(request.query)
-            
-            total_time = (time.time() - overall_start) * 1000
-            
-            timing = TimingInfo(
-                retrieval_ms=retrieval_timing.get('retrieval_ms', 0),
-                rerank_ms=retrieval_timing.get('rerank_ms', 0),
-                llm_ms=llm_timing.get('llm_ms', 0),
-                total_ms=total_time
-            )
-            
-            return QueryResponse(
-                answer="I don't have information about this in the uploaded documents.",
-                sources=[],
-                has_context=False,
-                general_answer=general_answer,
-                timing=timing,
-                token_usage=None,
-                session_id=request.session_id
-            )
+        if not retrieval_service.check_context_relevance(reranked_chunks):
+            return await _general_answer_response(request, retrieval_timing, overall_start)
         
         # Step 4: Generate answer with citations
-        answer, sources, llm_timing, token_usage = llm_service.generate_answer(
+        answer, sources, llm_timing, token_usage = await get_llm_service().generate_answer(
             query=request.query,
             context_chunks=reranked_chunks,
             chat_history=request.chat_history
         )
         
-        # Calculate total time
-        total_time = (time.time() - overall_start) * 1000
-        
-        timing = TimingInfo(
-            retrieval_ms=retrieval_timing.get('retrieval_ms', 0),
-            rerank_ms=retrieval_timing.get('rerank_ms', 0),
-            llm_ms=llm_timing.get('llm_ms', 0),
-            total_ms=total_time
-        )
-        
-        logger.info(f"✓ Query complete: {total_time:.0f}ms total")
-        
-        return QueryResponse(
+        response = QueryResponse(
             answer=answer,
             sources=sources,
             has_context=True,
-            timing=timing,
+            timing=_build_timing(retrieval_timing, llm_timing, overall_start),
             token_usage=token_usage,
             session_id=request.session_id
         )
         
+        logger.info("✓ Query complete: %.0fms total", response.timing.total_ms)
+        
+        _cache_answer(retrieval_service, request, response)
+        
+        return response
+        
+    except Exception as e:
+        logger.error("Error processing query: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """
+    Process a user query with RAG pipeline, streaming the answer as
+    Server-Sent Events.
+    
+    Events:
+    - token: {"text": "..."} for each piece of the answer as Gemini generates it
+    - done: the complete QueryResponse (same shape as /query)
+    - error: {"detail": "..."} if generation fails mid-stream
+    
+    Cache hits and general-knowledge answers are sent as a single done event.
+    
+    Args:
+        request: Query request with query text and optional chat history
+        
+    Returns:
+        text/event-stream response
+    """
+    overall_start = time.time()
+    
+    try:
+        logger.info("Streaming query: '%s...'", request.query[:50])
+        
+        retrieval_service = get_retrieval_service()
+        
+        response = await _get_cached_response(retrieval_service, request, overall_start)
+        
+        if response is None:
+            # Step 1 & 2: Retrieve and rerank
+            reranked_chunks, retrieval_timing = await retrieval_service.retrieve_and_rerank(
+                query=request.query
+            )
+            
+            # Step 3: Check if we have relevant context
+            if not retrieval_service.check_context_relevance(reranked_chunks):
+                response = await _general_answer_response(
+                    request, retrieval_timing, overall_start
+                )
+        
     except Exception as e:
-        logger.error(f"Error processing query: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.error("Error processing query: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        if response is not None:
+            yield _sse("done", response.model_dump_json())
+            return
+        
+        # Step 4: Stream answer with citations
+        try:
+            result = None
+            async for event, data in get_llm_service().stream_answer(
+                query=request.query,
+                context_chunks=reranked_chunks,
+                chat_history=request.chat_history
+            ):
+                if event == "token":
+                    yield _sse("token", json.dumps({"text": data}))
+                else:
+                    result = data
+            
+            answer, sources, llm_timing, token_usage = result
+            
+            streamed_response = QueryResponse(
+                answer=answer,
+                sources=sources,
+                has_context=True,
+                timing=_build_timing(retrieval_timing, llm_timing, overall_start),
+                token_usage=token_usage,
+                session_id=request.session_id
+            )
+            
+            logger.info("✓ Streamed query complete: %.0fms total", streamed_response.timing.total_ms)
+            
+            _cache_answer(retrieval_service, request, streamed_response)
+            
+            yield _sse("done", streamed_response.model_dump_json())
+            
+        except Exception as e:
+            logger.error("Error streaming answer: %s", e)
+            yield _sse("error", json.dumps({"detail": str(e)}))
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -2,17 +2,56 @@
 API routes for document upload and management.
 """
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
 import logging
 
 from app.models.schemas import TextProcessRequest, DocumentUploadResponse
 from app.services.ingestion import get_ingestion_service
+from app.services.retrieval import get_retrieval_service
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Read uploads in 256 KB pieces
+UPLOAD_READ_CHUNK_SIZE = 256 * 1024
+
+
+async def _read_upload(file: UploadFile) -> bytes:
+    """
+    Validate an uploaded file's type and size and read its content.
+    
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        File content as bytes
+    """
+    # Validate file type
+    _, dot, extension = file.filename.rpartition('.')
+    file_extension = f".{extension.lower()}" if dot else ""
+    if file_extension not in settings.allowed_file_types_set:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_extension}. "
+                   f"Allowed: {', '.join(settings.allowed_file_types)}"
+        )
+    
+    # Read file content in chunks, rejecting oversized files early
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+        buffer.extend(chunk)
+        
+        # Validate file size
+        if len(buffer) > settings.max_file_size_bytes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File too large. Max size: {settings.max_file_size_mb}MB"
+            )
+    return bytes(buffer)
+
 
 @router.post("/upload", response_model=DocumentUploadResponse)
 async def upload_document(
@@ -30,34 +69,22 @@ async def upload_document(
         Document upload response with statistics
     """
     try:
-        # Validate file type
-        file_extension = file.filename.split('.')[-1].lower()
-        if f".{file_extension}" not in settings.allowed_file_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type: .{file_extension}. "
-                       f"Allowed: {', '.join(settings.allowed_file_types)}"
-            )
-        
-        # Read file content
-        content = await file.read()
-        
-        # Validate file size
-        if len(content) > settings.max_file_size_bytes:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Max size: {settings.max_file_size_mb}MB"
-            )
+        content = await _read_upload(file)
         
         # Process document
         ingestion_service = get_ingestion_service()
         
-        result = ingestion_service.ingest_uploaded_file(
+        # Ingestion is blocking I/O; keep it off the event loop
+        result = await run_in_threadpool(
+            ingestion_service.ingest_uploaded_file,
             file_content=content,
             filename=file.filename,
             title=title
         )
         
+        # Cached answers may no longer reflect the document set
+        get_retrieval_service().clear_answer_cache()
+        
         return DocumentUploadResponse(**result)
         
     except HTTPException:
@@ -67,6 +94,46 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/upload/batch", response_model=List[DocumentUploadResponse])
+async def upload_documents(files: List[UploadFile] = File(...)):
+    """
+    Upload and process several documents in one batch.
+    
+    All files are chunked first, then embedded and stored together with a
+    single embedding batch and vector store upsert.
+    
+    Args:
+        files: Document files
+        
+    Returns:
+        Document upload response for each file, in upload order
+    """
+    try:
+        uploads = []
+        for file in files:
+            content = await _read_upload(file)
+            uploads.append((content, file.filename, None))
+        
+        # Process documents
+        ingestion_service = get_ingestion_service()
+        
+        results = await run_in_threadpool(
+            ingestion_service.ingest_uploaded_files,
+            uploads
+        )
+        
+        # Cached answers may no longer reflect the document set
+        get_retrieval_service().clear_answer_cache()
+        
+        return [DocumentUploadResponse(**result) for result in results]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error uploading documents: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/text", response_model=DocumentUploadResponse)
 async def process_text(request: TextProcessRequest):
     """
@@ -81,11 +148,15 @@ async def process_text(request: TextProcessRequest):
     try:
         ingestion_service = get_ingestion_service()
         
-        result = ingestion_service.ingest_text(
+        # Awaits the Qdrant upsert on the event loop instead of a pool thread
+        result = await ingestion_service.aingest_text(
             text=request.text,
             title=request.title or "Pasted Text"
         )
         
+        # Cached answers may no longer reflect the document set
+        get_retrieval_service().clear_answer_cache()
+        
         return DocumentUploadResponse(**result)
         
     except Exception as e:
@@ -126,6 +197,7 @@ async def delete_document(document_id: str):
         
         vectorstore = get_vectorstore_service()
         vectorstore.delete_by_source(document_id)
+        get_retrieval_service().clear_answer_cache()
         
         return {
             "success": True,
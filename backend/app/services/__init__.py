@@ -1,4 +1,4 @@
-"""Services package: ingestion, embeddings, vectorstore, retrieval, llm."""
+"""Services package: ingestion, embeddings, vectorstore, retrieval, llm, gemini."""
 
 __all__ = [
     "ingestion",
@@ -6,4 +6,5 @@ __all__ = [
     "vectorstore",
     "retrieval",
     "llm",
+    "gemini",
 ]
@@ -0,0 +1,142 @@
+"""
+Local SQLite store for chunk text.
+Keeps full chunk text out of the Qdrant payload; Qdrant holds only the
+pointer fields and search results are hydrated from here.
+"""
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import sqlite3
+import threading
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+SQLITE_MAX_PARAMS = 900
+
+
+class ChunkTextStore:
+    """
+    Chunk text keyed by Qdrant point ID.
+
+    Point IDs are deterministic per (source, chunk index), so an upsert
+    here overwrites the same rows Qdrant overwrites.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets several server workers read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "point_id TEXT PRIMARY KEY, "
+            "source TEXT NOT NULL, "
+            "chunk_index INTEGER, "
+            "text TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source)")
+        self._conn.commit()
+
+        logger.info(f"ChunkTextStore initialized at {path}")
+
+    def put_many(self, rows: List[Tuple[str, str, Optional[int], str]]) -> None:
+        """
+        Insert or replace chunk texts.
+
+        Args:
+            rows: (point_id, source, chunk_index, text) tuples
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (point_id, source, chunk_index, text) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def get_many(self, point_ids: List[str]) -> Dict[str, str]:
+        """
+        Fetch chunk texts by point ID.
+
+        Args:
+            point_ids: Qdrant point IDs
+
+        Returns:
+            Mapping of point ID to text (missing IDs are left out)
+        """
+        texts = {}
+        with self._lock:
+            for start in range(0, len(point_ids), SQLITE_MAX_PARAMS):
+                batch = point_ids[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                texts.update(self._conn.execute(
+                    f"SELECT point_id, text FROM chunks WHERE point_id IN ({placeholders})",
+                    batch
+                ))
+        return texts
+
+    def delete_by_source(self, source: str, min_chunk_index: int = 0) -> None:
+        """
+        Delete a source's chunks, optionally only those from an index on.
+
+        Args:
+            source: Source document name
+            min_chunk_index: First chunk index to delete (0 = all)
+        """
+        with self._lock, self._conn:
+            if min_chunk_index:
+                self._conn.execute(
+                    "DELETE FROM chunks WHERE source = ? "
+                    "AND (chunk_index IS NULL OR chunk_index >= ?)",
+                    (source, min_chunk_index)
+                )
+            else:
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+
+    def clear(self) -> None:
+        """Delete every stored chunk text."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+# Global instance
+_chunk_text_store = None
+_chunk_text_store_lock = threading.Lock()
+
+
+def get_chunk_text_store() -> Optional[ChunkTextStore]:
+    """
+    Get or create the global ChunkTextStore instance.
+
+    Returns:
+        ChunkTextStore instance, or None if chunk text is kept in Qdrant
+        (chunk_text_store_path unset)
+    """
+    global _chunk_text_store
+    if not settings.chunk_text_store_path:
+        return None
+    if _chunk_text_store is None:
+        with _chunk_text_store_lock:
+            # Re-check: another thread may have built it while we waited
+            if _chunk_text_store is None:
+                _chunk_text_store = ChunkTextStore(settings.chunk_text_store_path)
+    return _chunk_text_store
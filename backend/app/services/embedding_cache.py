@@ -0,0 +1,126 @@
+"""
+On-disk cache of Gemini embeddings.
+Lets re-ingestion and repeated test runs skip embedding texts that were
+already embedded with the same model and task type.
+"""
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+SQLITE_MAX_PARAMS = 900
+
+
+class EmbeddingCache:
+    """
+    Float32 embedding vectors keyed by a hash of (model, task type, text).
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets several server workers read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, "
+            "vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+        logger.info(f"EmbeddingCache initialized at {path}")
+
+    @staticmethod
+    def key(model: str, task_type: str, text: str) -> str:
+        """Cache key for one text embedded with a model and task type."""
+        return hashlib.blake2b(
+            f"{model}\0{task_type}\0{text}".encode(), digest_size=16
+        ).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Fetch cached vectors.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of key to float32 vector (missing keys are left out)
+        """
+        vectors = {}
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+                batch = keys[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                for key, blob in self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ):
+                    vectors[key] = np.frombuffer(blob, dtype=np.float32)
+        return vectors
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        """
+        Store vectors.
+
+        Args:
+            items: (key, vector) pairs
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, vector in items
+                ]
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+# Global instance
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get or create the global EmbeddingCache instance.
+
+    Returns:
+        EmbeddingCache instance, or None if embeddings are not cached on
+        disk (embedding_cache_path unset)
+    """
+    global _embedding_cache
+    if not settings.embedding_cache_path:
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            # Re-check: another thread may have built it while we waited
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(settings.embedding_cache_path)
+    return _embedding_cache
@@ -3,93 +3,386 @@ Gemini Embeddings Service (v1beta compatible)
 Uses gemini-embedding-001 (3072 dimensions)
 """
 
-from typing import List
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 import logging
-import google.generativeai as genai
+import math
+import queue
+import threading
+import time
+import numpy as np
 
 from app.config import settings
+from app.services.embedding_cache import get_embedding_cache
+from app.services.gemini import get_genai
 
 logger = logging.getLogger(__name__)
 
+# Gemini caps the number of contents per batch embedding request
+EMBED_BATCH_SIZE = 100
+
+# Maximum number of sub-batch requests in flight at once
+EMBED_MAX_CONCURRENCY = 8
+
+# Fraction of the configured per-minute quotas actually used
+EMBED_RATE_SAFETY = 0.8
+
+# Collapse line breaks and tabs to spaces in a single C-level pass
+_WHITESPACE_TABLE = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket refilled at a fixed per-minute rate.
+    
+    acquire() blocks until enough capacity is available, so callers pace
+    themselves under a quota instead of failing with 429s and retrying.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> None:
+        """Take amount tokens, waiting for the bucket to refill if needed."""
+        # A request larger than a full minute's quota still gets through once full
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BatchingEmbedder:
+    """
+    Coalesces small embedding requests from concurrent callers into shared
+    Gemini batch requests.
+    
+    A background thread takes the first pending request, waits up to
+    max_wait_ms for more to arrive, embeds up to max_batch texts in one
+    call and hands each caller its slice of the result.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        max_batch: int = EMBED_BATCH_SIZE,
+        max_wait_ms: int = 8,
+    ):
+        self._embed_fn = embed_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+
+        self._worker = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, texts: List[str]) -> List[List[float]]:
+        """Embed up to max_batch texts, blocking until their batch is done."""
+        if len(texts) > self.max_batch:
+            raise ValueError(f"Cannot submit more than {self.max_batch} texts")
+
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _run(self) -> None:
+        carry: Optional[Tuple[List[str], Future]] = None
+        while True:
+            first = carry or self._queue.get()
+            carry = None
+
+            items = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if size + len(item[0]) > self.max_batch:
+                    # Doesn't fit; it starts the next batch
+                    carry = item
+                    break
+                items.append(item)
+                size += len(item[0])
+
+            self._dispatch(items)
+
+    def _dispatch(self, items: List[Tuple[List[str], Future]]) -> None:
+        texts = [text for item_texts, _ in items for text in item_texts]
+        try:
+            embeddings = self._embed_fn(texts)
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+
+        if len(items) > 1:
+            logger.info("Coalesced %d embed requests into one batch of %d", len(items), len(texts))
+
+        start = 0
+        for item_texts, future in items:
+            future.set_result(embeddings[start:start + len(item_texts)])
+            start += len(item_texts)
+
 
 class EmbeddingService:
     def __init__(self):
-        genai.configure(api_key=settings.google_api_key)
+        self._genai = get_genai()
 
         self.model = settings.embedding_model
         self.dimension = settings.embedding_dimension
+        # Stored dimension; below self.dimension, vectors are truncated
+        self.output_dimension = settings.vector_dimension
+
+        # Repeat queries skip the Gemini round-trip entirely
+        self._cached_query_embedding = lru_cache(
+            maxsize=settings.query_embedding_cache_size
+        )(self._embed_query_uncached)
+
+        # Full-dimension vectors from earlier runs, keyed per model and task
+        self._disk_cache = get_embedding_cache()
+
+        # Stay under Gemini's per-minute quotas rather than hitting 429s
+        self._request_limiter = None
+        self._token_limiter = None
+        if settings.embed_rpm_limit > 0:
+            self._request_limiter = RateLimiter(settings.embed_rpm_limit * EMBED_RATE_SAFETY)
+        if settings.embed_tpm_limit > 0:
+            self._token_limiter = RateLimiter(settings.embed_tpm_limit * EMBED_RATE_SAFETY)
+
+        # Small batches from concurrent ingestions share Gemini requests
+        self._batcher = None
+        if settings.embed_batch_wait_ms > 0:
+            self._batcher = BatchingEmbedder(
+                self._embed_documents,
+                max_batch=EMBED_BATCH_SIZE,
+                max_wait_ms=settings.embed_batch_wait_ms,
+            )
 
         logger.info(
             f"Initialized Gemini EmbeddingService with model: {self.model}"
         )
 
     def _clean(self, text: str) -> str:
-        return text.replace("\n", " ").strip()
+        return text.translate(_WHITESPACE_TABLE).strip()
+
+    def _truncate(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Keep the leading output_dimension components and renormalize.
 
-    def embed_text(self, text: str) -> List[float]:
+        Gemini embeddings are Matryoshka-trained, so a prefix is itself a
+        usable embedding, but it is no longer unit length.
+        """
+        if self.output_dimension >= self.dimension:
+            return vectors
+
+        truncated = vectors[..., :self.output_dimension]
+        norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+        return (truncated / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def _embed_content(self, content, task_type: str) -> dict:
+        """Call Gemini embed_content, waiting on the rate limiters first."""
+        if self._request_limiter is not None:
+            self._request_limiter.acquire()
+        if self._token_limiter is not None:
+            texts = content if isinstance(content, list) else [content]
+            # ~4 characters per token
+            self._token_limiter.acquire(math.ceil(sum(map(len, texts)) / 4))
+
+        return self._genai.embed_content(
+            model=self.model,
+            content=content,
+            task_type=task_type,
+        )
+
+    def _cache_get(self, task_type: str, texts: List[str]) -> Tuple[List[str], dict]:
+        """Disk cache keys for texts, and the full-dimension vectors already cached."""
+        keys = [self._disk_cache.key(self.model, task_type, text) for text in texts]
+        cached = {
+            key: vector
+            for key, vector in self._disk_cache.get_many(keys).items()
+            if len(vector) == self.dimension
+        }
+        return keys, cached
+
+    def embed_text(self, text: str) -> np.ndarray:
         text = self._clean(text)
         if not text:
             raise ValueError("Cannot embed empty text")
 
-        result = genai.embed_content(
-            model=self.model,
-            content=text,
-            task_type="retrieval_document",
-        )
+        cached = None
+        if self._disk_cache is not None:
+            keys, hits = self._cache_get("retrieval_document", [text])
+            cached = hits.get(keys[0])
 
-        embedding = result["embedding"]
+        if cached is not None:
+            # Cached vectors are read-only views of the SQLite blob
+            embedding = cached.copy()
+        else:
+            result = self._embed_content(text, "retrieval_document")
 
-        if len(embedding) != self.dimension:
-            logger.warning(
-                f"Embedding dimension mismatch: "
-                f"expected {self.dimension}, got {len(embedding)}"
-            )
+            # float32 array, like embed_batch rows
+            embedding = np.asarray(result["embedding"], dtype=np.float32)
+
+            if len(embedding) != self.dimension:
+                logger.warning(
+                    "Embedding dimension mismatch: expected %d, got %d",
+                    self.dimension,
+                    len(embedding),
+                )
+            elif self._disk_cache is not None:
+                self._disk_cache.put_many([(keys[0], embedding)])
 
-        return embedding
+        return self._truncate(embedding)
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        embeddings: List[List[float]] = []
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        cleaned_texts: List[str] = []
 
         for i, text in enumerate(texts):
             cleaned = self._clean(text)
             if not cleaned:
-                logger.warning(f"Skipping empty chunk at index {i}")
+                logger.warning("Skipping empty chunk at index %d", i)
                 continue
+            cleaned_texts.append(cleaned)
 
-            try:
-                result = genai.embed_content(
-                    model=self.model,
-                    content=cleaned,
-                    task_type="retrieval_document",
+        # Embed each distinct text once (repeated headers, boilerplate, ...)
+        unique_index = {}
+        for text in cleaned_texts:
+            unique_index.setdefault(text, len(unique_index))
+        unique_texts = list(unique_index)
+
+        # Fill one contiguous float32 buffer instead of a list of float lists
+        embeddings = np.empty((len(unique_texts), self.dimension), dtype=np.float32)
+
+        # Only texts missing from the disk cache go to Gemini
+        missing = list(range(len(unique_texts)))
+        if self._disk_cache is not None and unique_texts:
+            keys, cached = self._cache_get("retrieval_document", unique_texts)
+            missing = []
+            for i, key in enumerate(keys):
+                vector = cached.get(key)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    embeddings[i] = vector
+            if cached:
+                logger.info(
+                    "Embedding cache: %d hits, %d misses",
+                    len(unique_texts) - len(missing),
+                    len(missing),
                 )
-                embeddings.append(result["embedding"])
+        missing_texts = [unique_texts[i] for i in missing]
+
+        # One request per sub-batch instead of one round-trip per chunk
+        starts = range(0, len(missing_texts), EMBED_BATCH_SIZE)
+        batches = [missing_texts[start:start + EMBED_BATCH_SIZE] for start in starts]
 
-            except Exception as e:
-                logger.error(f"Embedding failed at index {i}: {e}")
-                raise
+        if len(batches) == 1 and self._batcher is not None:
+            # Fits in one request: let concurrent callers share it
+            results = [self._batcher.submit(batches[0])]
+        elif len(batches) <= 1:
+            results = [self._embed_documents(batch) for batch in batches]
+        else:
+            # Overlap network waits across sub-batches; map() keeps order
+            workers = min(EMBED_MAX_CONCURRENCY, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self._embed_documents, batches))
 
-        logger.info(f"Generated {len(embeddings)} embeddings")
+        for start, batch_embeddings in zip(starts, results):
+            if batch_embeddings and len(batch_embeddings[0]) != self.dimension:
+                raise ValueError(
+                    f"Embedding dimension mismatch: "
+                    f"expected {self.dimension}, got {len(batch_embeddings[0])}"
+                )
+            embeddings[missing[start:start + len(batch_embeddings)]] = batch_embeddings
+
+        if self._disk_cache is not None and missing:
+            # Cache full-dimension vectors so output_dimension can change later
+            self._disk_cache.put_many([(keys[i], embeddings[i]) for i in missing])
+
+        embeddings = self._truncate(embeddings)
+
+        if len(unique_texts) < len(cleaned_texts):
+            logger.info(
+                "Embedded %d unique texts for %d chunks",
+                len(unique_texts),
+                len(cleaned_texts),
+            )
+            # Scatter back to one row per chunk
+            embeddings = embeddings[[unique_index[text] for text in cleaned_texts]]
+
+        logger.info("Generated %d embeddings", len(embeddings))
         return embeddings
 
+    def _embed_documents(self, batch: List[str]) -> List[List[float]]:
+        try:
+            result = self._embed_content(batch, "retrieval_document")
+            return result["embedding"]
+
+        except Exception as e:
+            logger.error("Embedding failed for batch of %d chunks: %s", len(batch), e)
+            raise
+
     def embed_query(self, query: str) -> List[float]:
         query = self._clean(query)
         if not query:
             raise ValueError("Cannot embed empty query")
 
-        result = genai.embed_content(
-            model=self.model,
-            content=query,
-            task_type="retrieval_query",
-        )
+        return list(self._cached_query_embedding(query))
+
+    def _embed_query_uncached(self, query: str) -> Tuple[float, ...]:
+        cached = None
+        if self._disk_cache is not None:
+            keys, hits = self._cache_get("retrieval_query", [query])
+            cached = hits.get(keys[0])
+
+        if cached is not None:
+            embedding = cached.tolist()
+        else:
+            result = self._embed_content(query, "retrieval_query")
+
+            embedding = result["embedding"]
+            if self._disk_cache is not None and len(embedding) == self.dimension:
+                self._disk_cache.put_many([(keys[0], embedding)])
+        if self.output_dimension < self.dimension:
+            embedding = self._truncate(np.asarray(embedding, dtype=np.float32)).tolist()
+
+        return tuple(embedding)
 
-        return result["embedding"]
+    def clear_query_cache(self) -> None:
+        self._cached_query_embedding.cache_clear()
+        logger.info("Cleared query embedding cache")
 
 
 _embedding_service = None
+_embedding_service_lock = threading.Lock()
 
 
 def get_embedding_service() -> EmbeddingService:
     global _embedding_service
     if _embedding_service is None:
-        _embedding_service = EmbeddingService()
+        with _embedding_service_lock:
+            # Re-check: another thread may have built it while we waited
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService()
     return _embedding_service
@@ -0,0 +1,36 @@
+"""
+Shared Google Gemini SDK setup.
+Configures the SDK once per process so every service reuses one transport.
+"""
+import threading
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """
+    Import and configure google.generativeai on first use.
+    
+    The import is deferred because the SDK pulls in grpc/protobuf, which
+    health-check-only workers never need. The lock keeps services that are
+    preloaded in parallel threads from configuring it twice.
+    
+    Returns:
+        The configured google.generativeai module
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=settings.google_api_key, transport="grpc")
+                logger.info("Configured Gemini SDK (grpc transport)")
+                _genai = genai
+    return _genai
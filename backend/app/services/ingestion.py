@@ -1,16 +1,18 @@
 """
 Document ingestion service - complete pipeline from upload to vector store.
 """
+import asyncio
 import time
-from typing import Dict, Any, Tuple
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple, Union
 import logging
-from pathlib import Path
-import tempfile
+import multiprocessing
 import os
+import threading
 
-from app.utils.parsers import DocumentParser
-from app.utils.chunking import create_chunks_from_document
-from app.utils.metadata import generate_chunk_id
+from app.utils.parsers import DocumentParser, ParsedDocument
+from app.utils.chunking import create_chunks_from_document, create_chunks_from_documents
+from app.utils.metadata import generate_chunk_ids
 from app.services.embeddings import get_embedding_service
 from app.services.vectorstore import get_vectorstore_service
 from app.config import settings
@@ -18,6 +20,246 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 
+def _file_extension(file_name: str) -> str:
+    """Return the lowercased extension of a file name (e.g. '.pdf'), or ''."""
+    _, dot, extension = file_name.rpartition('.')
+    return f".{extension.lower()}" if dot else ""
+
+
+def _content_hash(data: bytes) -> str:
+    """
+    Fingerprint document content so unchanged re-uploads can be skipped.
+    
+    The chunking and embedding settings are folded in, so after changing
+    them a re-upload is re-chunked and re-embedded instead of skipped.
+    """
+    digest = hashlib.blake2b(data, digest_size=16)
+    digest.update(
+        f"\0{settings.chunk_size}:{settings.chunk_overlap}:"
+        f"{settings.embedding_model}:{settings.vector_dimension}".encode()
+    )
+    return digest.hexdigest()
+
+
+def _tag_document(
+    metadatas: List[Dict[str, Any]],
+    content_hash: str,
+    parsed: ParsedDocument
+) -> None:
+    """Record document-level fields on each chunk, for unchanged re-uploads."""
+    for metadata in metadatas:
+        metadata["content_hash"] = content_hash
+        metadata["links_count"] = len(parsed.links)
+        metadata["images_count"] = len(parsed.images)
+
+
+def _job_size(file: Union[str, Tuple[bytes, str]]) -> int:
+    """Size in bytes of an ingestion job's file (path or in-memory upload)."""
+    if isinstance(file, str):
+        try:
+            return os.stat(file).st_size
+        except OSError:
+            return 0
+    return len(file[0])
+
+
+def _parse_file(file_path: str) -> ParsedDocument:
+    """
+    Validate and parse a document file.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        Parsed document
+    """
+    # Validate file exists and get its size with a single stat call
+    try:
+        file_size = os.stat(file_path).st_size
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {file_path}")
+    
+    file_name = os.path.basename(file_path)
+    
+    logger.info(f"Ingesting file: {file_name} ({file_size} bytes)")
+    
+    # Validate file type
+    file_extension = _file_extension(file_name)
+    if file_extension not in settings.allowed_file_types_set:
+        raise ValueError(
+            f"Unsupported file type: {file_extension}. "
+            f"Allowed: {settings.allowed_file_types}"
+        )
+    
+    # Validate file size
+    if file_size > settings.max_file_size_bytes:
+        raise ValueError(
+            f"File too large: {file_size} bytes. "
+            f"Max: {settings.max_file_size_bytes} bytes"
+        )
+    
+    # Parse document
+    logger.info("Parsing document...")
+    return DocumentParser.parse_file(file_path)
+
+
+def _parse_upload(file_content: bytes, filename: str) -> ParsedDocument:
+    """
+    Validate and parse uploaded file content in memory.
+    
+    Args:
+        file_content: File content as bytes
+        filename: Original filename
+        
+    Returns:
+        Parsed document
+    """
+    file_size = len(file_content)
+    
+    logger.info(f"Ingesting file: {filename} ({file_size} bytes)")
+    
+    # Validate file type
+    file_extension = _file_extension(filename)
+    if file_extension not in settings.allowed_file_types_set:
+        raise ValueError(
+            f"Unsupported file type: {file_extension}. "
+            f"Allowed: {settings.allowed_file_types}"
+        )
+    
+    # Validate file size
+    if file_size > settings.max_file_size_bytes:
+        raise ValueError(
+            f"File too large: {file_size} bytes. "
+            f"Max: {settings.max_file_size_bytes} bytes"
+        )
+    
+    # Parse document
+    logger.info("Parsing document...")
+    return DocumentParser.parse_bytes(file_content, filename)
+
+
+def _chunk_document(
+    parsed: ParsedDocument,
+    source_name: str
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Chunk a parsed document and attach per-chunk metadata.
+    
+    Args:
+        parsed: Parsed document
+        source_name: Source document name
+    
+    Returns:
+        Tuple of (chunks, metadatas)
+    """
+    chunks_with_metadata = create_chunks_from_document(
+        text=parsed.text,
+        source=source_name,
+        title=parsed.title,
+        links=parsed.links,
+        images=parsed.images,
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap
+    )
+    return _split_chunks(chunks_with_metadata, source_name)
+
+
+def _chunk_documents(
+    documents: List[Tuple[ParsedDocument, str]]
+) -> List[Tuple[List[str], List[Dict[str, Any]]]]:
+    """
+    Chunk several parsed documents, tokenizing them in one batch.
+    
+    Args:
+        documents: (parsed document, source name) pairs
+    
+    Returns:
+        (chunks, metadatas) for each document, in input order
+    """
+    chunk_lists = create_chunks_from_documents(
+        [
+            (parsed.text, source_name, parsed.title, parsed.links, parsed.images)
+            for parsed, source_name in documents
+        ],
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap
+    )
+    return [
+        _split_chunks(chunks_with_metadata, source_name)
+        for chunks_with_metadata, (_, source_name) in zip(chunk_lists, documents)
+    ]
+
+
+def _split_chunks(
+    chunks_with_metadata: List[Tuple[str, Dict[str, Any]]],
+    source_name: str
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Split (chunk, metadata) pairs into parallel lists and add chunk IDs."""
+    # Extract chunks and metadata
+    chunks = [chunk_text for chunk_text, _ in chunks_with_metadata]
+    metadatas = [metadata for _, metadata in chunks_with_metadata]
+    
+    # Add unique chunk IDs; each chunk already owns a fresh metadata dict,
+    # so it is updated in place rather than copied
+    for metadata, chunk_id in zip(metadatas, generate_chunk_ids(chunks, source_name)):
+        metadata["chunk_id"] = chunk_id
+    
+    logger.info(f"Created {len(chunks)} chunks")
+    return chunks, metadatas
+
+
+def _parse_job(
+    file: Union[str, Tuple[bytes, str]],
+    title: Optional[str]
+) -> ParsedDocument:
+    """
+    Parse one file, applying a custom title.
+    
+    Args:
+        file: Path to the file, or (file_content, filename) for uploads
+        title: Optional custom title
+        
+    Returns:
+        Parsed document
+    """
+    if isinstance(file, str):
+        parsed = _parse_file(file)
+    else:
+        parsed = _parse_upload(*file)
+    
+    # Use custom title if provided
+    if title and title != parsed.title:
+        parsed = ParsedDocument(parsed.text, parsed.links, parsed.images, title)
+    return parsed
+
+
+def _parse_and_chunk_worker(
+    file: Union[str, Tuple[bytes, str]],
+    title: Optional[str],
+    source_name: str
+) -> Tuple[ParsedDocument, List[str], List[Dict[str, Any]]]:
+    """
+    Parse and chunk one file.
+    
+    Module-level (and free of service state) so it can run in a worker
+    process.
+    
+    Args:
+        file: Path to the file, or (file_content, filename) for uploads
+        title: Optional custom title
+        source_name: Source document name stored with each chunk
+        
+    Returns:
+        Tuple of (parsed document, chunks, metadatas)
+    """
+    parsed = _parse_job(file, title)
+    
+    # Chunk text
+    logger.info("Chunking text...")
+    chunks, metadatas = _chunk_document(parsed, source_name)
+    return parsed, chunks, metadatas
+
+
 class IngestionService:
     """
     Service for ingesting documents into the RAG system.
@@ -67,56 +309,27 @@ class IngestionService:
             
             logger.info(f"Ingesting text: {title} ({len(text)} chars)")
             
+            # Skip the whole pipeline if this exact text is already stored
+            content_hash = _content_hash(text.encode())
+            unchanged = self._find_unchanged_source(source_name, content_hash, title)
+            if unchanged:
+                return self._build_unchanged_result(source_name, unchanged, start_time)
+            
             # Parse text
             parsed = DocumentParser.parse_raw_text(text, title)
             
-            # Delete existing chunks from this source (if any)
-            self._delete_existing_source(source_name)
-            
             # Chunk text
-            chunks_with_metadata = create_chunks_from_document(
-                text=parsed.text,
-                source=source_name,
-                title=parsed.title,
-                links=parsed.links,
-                images=parsed.images,
-                chunk_size=settings.chunk_size,
-                chunk_overlap=settings.chunk_overlap
-            )
-            
-            # Extract chunks and metadata
-            chunks = []
-            metadatas = []
+            chunks, metadatas = _chunk_document(parsed, source_name)
+            _tag_document(metadatas, content_hash, parsed)
             
-            for idx, (chunk_text, base_metadata) in enumerate(chunks_with_metadata):
-                chunks.append(chunk_text)
-                
-                # Add unique chunk ID
-                metadata = base_metadata.copy()
-                metadata["chunk_id"] = generate_chunk_id(chunk_text, source_name, idx)
-                metadatas.append(metadata)
-            
-            logger.info(f"Created {len(chunks)} chunks")
-            
-            # Generate embeddings
-            logger.info("Generating embeddings...")
-            embeddings = self.embedding_service.embed_batch(chunks)
-            
-            # Store in vector database
-            logger.info("Storing in vector database...")
-            count = self.vectorstore.upsert_chunks(chunks, embeddings, metadatas)
+            # Embed and store; points overwrite earlier versions by ID
+            count = self._embed_and_store(chunks, metadatas)
+            if count == len(chunks):
+                self._delete_stale_chunks(source_name, count)
             
             processing_time = (time.time() - start_time) * 1000
             
-            result = {
-                "success": True,
-                "document_id": source_name,
-                "title": title,
-                "chunks_created": count,
-                "links_extracted": len(parsed.links),
-                "images_extracted": len(parsed.images),
-                "processing_time_ms": processing_time
-            }
+            result = self._build_result(source_name, title, parsed, count, processing_time)
             logger.info(f"Parsed text length: {len(parsed.text)}")
             logger.info(f"✓ Text ingestion complete: {count} chunks in {processing_time:.0f}ms")
             return result
@@ -125,17 +338,23 @@ class IngestionService:
             logger.error(f"Error ingesting text: {e}")
             raise
     
-    def ingest_file(
+    async def aingest_text(
         self,
-        file_path: str,
-        title: str = None
+        text: str,
+        title: str = "Pasted Text",
+        source_name: str = None
     ) -> Dict[str, Any]:
         """
-        Ingest a document file (PDF, TXT, MD).
+        Ingest pasted text from the event loop.
+        
+        Same pipeline as ingest_text, but the vector store upsert is awaited
+        on the async Qdrant client instead of holding a worker thread for
+        the whole upload; blocking steps run in threads.
         
         Args:
-            file_path: Path to the file
-            title: Optional custom title (otherwise extracted from file)
+            text: Raw text content
+            title: Document title
+            source_name: Optional source identifier
             
         Returns:
             Ingestion result with statistics
@@ -143,97 +362,90 @@ class IngestionService:
         start_time = time.time()
         
         try:
-            # Validate file exists
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-            
-            # Get file info
-            file_size = os.path.getsize(file_path)
-            file_name = Path(file_path).name
-            
-            logger.info(f"Ingesting file: {file_name} ({file_size} bytes)")
-            
-            # Validate file type
-            file_extension = Path(file_path).suffix.lower()
-            if file_extension not in settings.allowed_file_types:
-                raise ValueError(
-                    f"Unsupported file type: {file_extension}. "
-                    f"Allowed: {settings.allowed_file_types}"
-                )
-            
-            # Validate file size
-            if file_size > settings.max_file_size_bytes:
-                raise ValueError(
-                    f"File too large: {file_size} bytes. "
-                    f"Max: {settings.max_file_size_bytes} bytes"
-                )
-            
-            # Parse document
-            logger.info("Parsing document...")
-            parsed = DocumentParser.parse_file(file_path)
-            
-            # Use custom title if provided
-            if title:
-                parsed.title = title
+            # Generate source name if not provided
+            if not source_name:
+                source_name = f"text_{int(time.time())}.txt"
             
-            # Delete existing chunks from this source (if any)
-            self._delete_existing_source(file_name)
+            logger.info(f"Ingesting text: {title} ({len(text)} chars)")
             
-            # Chunk text
-            logger.info("Chunking text...")
-            chunks_with_metadata = create_chunks_from_document(
-                text=parsed.text,
-                source=file_name,
-                title=parsed.title,
-                links=parsed.links,
-                images=parsed.images,
-                chunk_size=settings.chunk_size,
-                chunk_overlap=settings.chunk_overlap
+            # Skip the whole pipeline if this exact text is already stored
+            content_hash = _content_hash(text.encode())
+            unchanged = await asyncio.to_thread(
+                self._find_unchanged_source, source_name, content_hash, title
             )
+            if unchanged:
+                return self._build_unchanged_result(source_name, unchanged, start_time)
             
-            # Extract chunks and metadata
-            chunks = []
-            metadatas = []
-            
-            for idx, (chunk_text, base_metadata) in enumerate(chunks_with_metadata):
-                chunks.append(chunk_text)
-                
-                # Add unique chunk ID
-                metadata = base_metadata.copy()
-                metadata["chunk_id"] = generate_chunk_id(chunk_text, file_name, idx)
-                metadatas.append(metadata)
-            
-            logger.info(f"Created {len(chunks)} chunks")
+            # Parse and chunk text
+            parsed = DocumentParser.parse_raw_text(text, title)
+            chunks, metadatas = await asyncio.to_thread(_chunk_document, parsed, source_name)
+            _tag_document(metadatas, content_hash, parsed)
             
-            # Generate embeddings
+            # Embed in a thread, then await the upsert
             logger.info("Generating embeddings...")
-            embeddings = self.embedding_service.embed_batch(chunks)
+            embeddings = await asyncio.to_thread(self.embedding_service.embed_batch, chunks)
             
-            # Store in vector database
             logger.info("Storing in vector database...")
-            count = self.vectorstore.upsert_chunks(chunks, embeddings, metadatas)
+            if len(chunks) < settings.qdrant_bulk_min_points:
+                count = await self.vectorstore.aupsert_chunks(chunks, embeddings, metadatas)
+            else:
+                count = await asyncio.to_thread(self._store_bulk, chunks, embeddings, metadatas)
+            if count == len(chunks):
+                await asyncio.to_thread(self._delete_stale_chunks, source_name, count)
             
             processing_time = (time.time() - start_time) * 1000
             
-            result = {
-                "success": True,
-                "document_id": file_name,
-                "title": parsed.title,
-                "chunks_created": count,
-                "links_extracted": len(parsed.links),
-                "images_extracted": len(parsed.images),
-                "processing_time_ms": processing_time
-            }
-            logger.info(f"Parsed text preview: {parsed.text[:300]}")
-            logger.info(
-                f"✓ File ingestion complete: {count} chunks in {processing_time:.0f}ms"
-            )
+            result = self._build_result(source_name, title, parsed, count, processing_time)
+            logger.info(f"✓ Text ingestion complete: {count} chunks in {processing_time:.0f}ms")
             return result
             
         except Exception as e:
-            logger.error(f"Error ingesting file: {e}")
+            logger.error(f"Error ingesting text: {e}")
             raise
     
+    def ingest_file(
+        self,
+        file_path: str,
+        title: str = None
+    ) -> Dict[str, Any]:
+        """
+        Ingest a document file (PDF, TXT, MD).
+        
+        Args:
+            file_path: Path to the file
+            title: Optional custom title (otherwise extracted from file)
+            
+        Returns:
+            Ingestion result with statistics
+        """
+        return self.ingest_files([(file_path, title, None)])[0]
+    
+    def ingest_files(
+        self,
+        files: List[Tuple[str, Optional[str], Optional[str]]],
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ingest several document files with one embedding batch and one upsert.
+        
+        Parsing and chunking run per file; all chunks are then embedded and
+        stored together, so N files cost one embed_batch + upsert_chunks
+        call instead of N.
+        
+        Args:
+            files: (file_path, title, source_name) tuples; title and
+                source_name are optional (default: extracted title, file name)
+            max_workers: Processes for parsing/chunking (default from settings)
+            
+        Returns:
+            Ingestion result with statistics for each file, in input order
+        """
+        jobs = [
+            (file_path, title, source_name or os.path.basename(file_path))
+            for file_path, title, source_name in files
+        ]
+        return self._ingest_jobs(jobs, max_workers)
+    
     def ingest_uploaded_file(
         self,
         file_content: bytes,
@@ -251,47 +463,257 @@ class IngestionService:
         Returns:
             Ingestion result with statistics
         """
+        return self.ingest_uploaded_files([(file_content, filename, title)])[0]
+    
+    def ingest_uploaded_files(
+        self,
+        uploads: List[Tuple[bytes, str, Optional[str]]],
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ingest several uploaded files in one embedding/upsert batch.
+        
+        Content is parsed straight from memory; nothing is written to disk.
+        
+        Args:
+            uploads: (file_content, filename, title) tuples; title is optional
+            max_workers: Processes for parsing/chunking (default from settings)
+            
+        Returns:
+            Ingestion result with statistics for each file, in input order
+        """
+        # Store chunks under the original filename
+        jobs = [
+            ((file_content, filename), title or filename, filename)
+            for file_content, filename, title in uploads
+        ]
+        return self._ingest_jobs(jobs, max_workers)
+    
+    def _ingest_jobs(
+        self,
+        jobs: List[Tuple[Union[str, Tuple[bytes, str]], Optional[str], str]],
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Parse and chunk each job, then embed and store all chunks together.
+        
+        Args:
+            jobs: (file, title, source_name) tuples, as taken by
+                _parse_and_chunk_worker
+            max_workers: Processes for parsing/chunking (default from settings)
+            
+        Returns:
+            Ingestion result with statistics for each job, in input order
+        """
+        start_time = time.time()
+        
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(
-                delete=False,
-                suffix=Path(filename).suffix
-            ) as temp_file:
-                temp_file.write(file_content)
-                temp_path = temp_file.name
-            
-            try:
-                # Process the file
-                result = self.ingest_file(temp_path, title=title or filename)
+            # Uploads whose exact content is already stored skip parsing,
+            # embedding and the upsert entirely
+            results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+            pending = []
+            for index, (file, title, source_name) in enumerate(jobs):
+                content_hash = None if isinstance(file, str) else _content_hash(file[0])
+                unchanged = content_hash and self._find_unchanged_source(source_name, content_hash, title)
+                if unchanged:
+                    results[index] = self._build_unchanged_result(source_name, unchanged, start_time)
+                else:
+                    pending.append((index, (file, title, source_name), content_hash))
+            
+            if not pending:
+                return results
+            
+            pending_jobs = [job for _, job, _ in pending]
+            workers = min(max_workers or settings.ingestion_workers, len(pending_jobs))
+            # Spawned workers re-import the app and receive the file bytes
+            # pickled, which only pays off for large batches
+            if workers > 1 and (
+                sum(_job_size(file) for file, _, _ in pending_jobs)
+                < settings.ingestion_parallel_min_bytes
+            ):
+                workers = 1
+            if workers > 1:
+                # Parsing/chunking is CPU-bound Python, so spread it over
+                # processes; spawn avoids forking a process that holds
+                # gRPC/HTTP clients
+                with multiprocessing.get_context("spawn").Pool(workers) as pool:
+                    prepared = pool.starmap(_parse_and_chunk_worker, pending_jobs)
+            else:
+                # Inline: parse each file, then tokenize all of them in one batch
+                parsed_docs = [_parse_job(file, title) for file, title, _ in pending_jobs]
+                chunked = _chunk_documents([
+                    (parsed, source_name)
+                    for parsed, (_, _, source_name) in zip(parsed_docs, pending_jobs)
+                ])
+                prepared = [
+                    (parsed, chunks, metadatas)
+                    for parsed, (chunks, metadatas) in zip(parsed_docs, chunked)
+                ]
+            
+            all_chunks: List[str] = []
+            all_metadatas: List[Dict[str, Any]] = []
+            documents = []
+            
+            for (index, (_, _, source_name), content_hash), (parsed, chunks, metadatas) in zip(pending, prepared):
+                if content_hash:
+                    _tag_document(metadatas, content_hash, parsed)
                 
-                # Update document_id to use original filename
-                result["document_id"] = filename
-                
-                return result
+                all_chunks.extend(chunks)
+                all_metadatas.extend(metadatas)
+                documents.append((index, source_name, parsed, len(chunks)))
+            
+            # Embed and store all files together
+            count = self._embed_and_store(all_chunks, all_metadatas)
+            stored = count == len(all_chunks)
+            
+            processing_time = (time.time() - start_time) * 1000
+            
+            for index, source_name, parsed, chunk_count in documents:
+                if stored:
+                    self._delete_stale_chunks(source_name, chunk_count)
                 
-            finally:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    
+                logger.info(f"Parsed text preview: {parsed.text[:300]}")
+                results[index] = self._build_result(
+                    source_name,
+                    parsed.title,
+                    parsed,
+                    chunk_count if stored else 0,
+                    processing_time
+                )
+            
+            logger.info(
+                f"✓ File ingestion complete: {len(pending_jobs)} files, "
+                f"{count} chunks in {processing_time:.0f}ms"
+            )
+            return results
+            
         except Exception as e:
-            logger.error(f"Error ingesting uploaded file: {e}")
+            logger.error(f"Error ingesting file: {e}")
             raise
     
-    def _delete_existing_source(self, source_name: str):
+    def _embed_and_store(
+        self,
+        chunks: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> int:
         """
-        Delete existing chunks from a source (implements delete + reinsert).
+        Embed chunks and upsert them into the vector store.
+        
+        Args:
+            chunks: Chunk texts
+            metadatas: Metadata dict for each chunk
+            
+        Returns:
+            Number of chunks stored
+        """
+        # Generate embeddings
+        logger.info("Generating embeddings...")
+        embeddings = self.embedding_service.embed_batch(chunks)
+        
+        # Store in vector database
+        logger.info("Storing in vector database...")
+        if len(chunks) < settings.qdrant_bulk_min_points:
+            return self.vectorstore.upsert_chunks(chunks, embeddings, metadatas)
+        return self._store_bulk(chunks, embeddings, metadatas)
+    
+    def _store_bulk(
+        self,
+        chunks: List[str],
+        embeddings: Any,
+        metadatas: List[Dict[str, Any]]
+    ) -> int:
+        """Upsert a large batch, building the HNSW graph once at the end, not per batch."""
+        with self.vectorstore.bulk_mode():
+            return self.vectorstore.upsert_chunks(chunks, embeddings, metadatas)
+    
+    def _build_result(
+        self,
+        document_id: str,
+        title: str,
+        parsed: ParsedDocument,
+        count: int,
+        processing_time: float
+    ) -> Dict[str, Any]:
+        """Build the ingestion result dict returned to the API."""
+        return {
+            "success": True,
+            "document_id": document_id,
+            "title": title,
+            "chunks_created": count,
+            "links_extracted": len(parsed.links),
+            "images_extracted": len(parsed.images),
+            "processing_time_ms": processing_time
+        }
+    
+    def _find_unchanged_source(
+        self,
+        source_name: str,
+        content_hash: str,
+        title: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Check whether a source is already stored with identical content.
+        
+        Args:
+            source_name: Source document name
+            content_hash: Hash of the content being ingested
+            title: Title being ingested; a new title forces re-ingestion
+            
+        Returns:
+            Stored source info (as from get_source_fingerprint) if the
+            content is unchanged, otherwise None
+        """
+        stored = self.vectorstore.get_source_fingerprint(source_name)
+        if (
+            stored
+            and stored["chunk_count"]
+            and stored["content_hash"] == content_hash
+            and (not title or stored["title"] == title)
+        ):
+            logger.info(f"Skipping unchanged document: {source_name}")
+            return stored
+        return None
+    
+    def _build_unchanged_result(
+        self,
+        document_id: str,
+        stored: Dict[str, Any],
+        start_time: float
+    ) -> Dict[str, Any]:
+        """Build the ingestion result for a document that was already stored."""
+        return {
+            "success": True,
+            "document_id": document_id,
+            "title": stored["title"],
+            "chunks_created": stored["chunk_count"],
+            "links_extracted": stored["links_count"],
+            "images_extracted": stored["images_count"],
+            "processing_time_ms": (time.time() - start_time) * 1000
+        }
+    
+    def _delete_stale_chunks(self, source_name: str, chunk_count: int):
+        """
+        Delete chunks left over from an earlier version of a source.
+        
+        Point IDs are derived from (source, chunk_index), so re-ingesting a
+        document overwrites its points in place; only chunks beyond the new
+        chunk count (or stored before IDs were deterministic) need removing.
         
         Args:
             source_name: Source document name
+            chunk_count: Number of chunks in the version just stored
         """
         try:
-            existing_count = self.vectorstore.count_points()
-            if existing_count > 0:
-                logger.info(f"Deleting existing chunks from: {source_name}")
-                self.vectorstore.delete_by_source(source_name)
+            # Filtered count on the indexed source_id field; the delete is
+            # skipped unless the source holds more points than just stored
+            existing_count = self.vectorstore.count_by_source(source_name)
+            if existing_count > chunk_count:
+                logger.info(
+                    f"Deleting {existing_count - chunk_count} stale chunks from: {source_name}"
+                )
+                self.vectorstore.delete_stale_chunks(source_name, chunk_count)
         except Exception as e:
-            logger.warning(f"Could not delete existing source: {e}")
+            logger.warning(f"Could not delete stale chunks: {e}")
     
     def get_ingestion_stats(self) -> Dict[str, Any]:
         """
@@ -320,6 +742,7 @@ class IngestionService:
 
 # Global instance
 _ingestion_service = None
+_ingestion_service_lock = threading.Lock()
 
 
 def get_ingestion_service() -> IngestionService:
@@ -331,5 +754,8 @@ def get_ingestion_service() -> IngestionService:
     """
     global _ingestion_service
     if _ingestion_service is None:
-        _ingestion_service = IngestionService()
+        with _ingestion_service_lock:
+            # Re-check: another thread may have built it while we waited
+            if _ingestion_service is None:
+                _ingestion_service = IngestionService()
     return _ingestion_service
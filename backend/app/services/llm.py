@@ -3,15 +3,61 @@ LLM service for generating answers with inline citations.
 Uses Google Gemini with carefully crafted prompts.
 """
 import time
-from typing import List, Dict, Any, Tuple, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, AsyncIterator, Tuple, Optional
 import logging
-import google.generativeai as genai
+import threading
 
 from app.config import settings
+from app.services.gemini import get_genai
 from app.models.schemas import RerankedChunk, ChatMessage, SourceReference, TokenUsage
 
 logger = logging.getLogger(__name__)
 
+# Static instructions, kept as the leading prompt prefix so it is identical
+# across requests (eligible for Gemini's implicit prefix caching)
+SYSTEM_PROMPT = """You are a knowledgeable and friendly AI assistant that helps users understand their documents through engaging, conversational answers.
+
+CRITICAL RULES:
+1. Answer ONLY using information from the provided context
+2. ALWAYS use inline citations [1], [2], [3] after every claim or fact
+3. Write in a natural, conversational tone - like explaining to a colleague
+4. Structure longer answers with clear paragraphs for readability
+5. When relevant, provide examples or clarifications from the context
+6. If the context mentions links, naturally incorporate them: "You can learn more at [URL]"
+7. If the context mentions images, reference them: "as illustrated in the diagram [1]"
+8. If the context is insufficient, honestly say: "I don't have enough information in the uploaded documents to fully answer this."
+9. NEVER make up information beyond what's in the context
+
+FORMATTING GUIDELINES:
+- Use inline citations like [1], [2] immediately after each fact
+- Keep paragraphs focused (2-4 sentences each)
+- Use natural language, avoid robotic phrasing
+- When listing items, present them in sentence form with citations
+- Make your answer engaging and easy to follow
+
+CITATION EXAMPLES:
+✓ Good: "Deep learning uses neural networks with multiple layers [1]. Popular frameworks include TensorFlow and PyTorch [2]."
+✓ Good: "The system offers three main benefits: reduced hallucinations [1], up-to-date knowledge [2], and cost-effectiveness [3]."
+✗ Bad: "Deep learning uses neural networks. Popular frameworks include TensorFlow and PyTorch." (missing citations)
+"""
+
+
+@lru_cache(maxsize=None)
+def _available_models() -> frozenset:
+    """
+    List Gemini models that support generateContent (one API call, memoized).
+    
+    Returns:
+        Model names without the "models/" prefix
+    """
+    genai = get_genai()
+    return frozenset(
+        m.name.rsplit("/", 1)[-1]
+        for m in genai.list_models()
+        if "generateContent" in m.supported_generation_methods
+    )
+
 
 class LLMService:
     """
@@ -26,7 +72,7 @@ class LLMService:
     
     def __init__(self):
         """Initialize Gemini client."""
-        genai.configure(api_key=settings.google_api_key)
+        genai = get_genai()
         
         # Use the model name from settings - try common formats
         model_name = settings.llm_model
@@ -41,33 +87,40 @@ class LLMService:
             "models/gemini-pro"
         ]
         
-        self.model = None
-        for name in possible_names:
-            try:
-                self.model = genai.GenerativeModel(
-                    model_name=name,
-                    generation_config={
-                        "temperature": 0.7,
-                        "top_p": 0.95,
-                        "top_k": 40,
-                        "max_output_tokens": 2048,
-                    }
-                )
-                # Test if model works
-                self.model.count_tokens("test")
-                self.model_name = name
-                logger.info(f"LLMService initialized with model: {name}")
-                break
-            except Exception as e:
-                continue
+        # Pick the first candidate the API key can use, from a single
+        # list_models() call instead of probing each name
+        try:
+            available = _available_models()
+        except Exception as e:
+            logger.warning(f"Could not list Gemini models, using {model_name}: {e}")
+            available = None
         
-        if self.model is None:
+        name = next(
+            (
+                n for n in possible_names
+                if available is None or n.rsplit("/", 1)[-1] in available
+            ),
+            None
+        )
+        if name is None:
             raise ValueError(
                 f"Could not initialize Gemini model. Tried: {possible_names}. "
                 f"Run 'python list_models.py' to see available models."
             )
+        
+        self.model = genai.GenerativeModel(
+            model_name=name,
+            generation_config={
+                "temperature": 0.7,
+                "top_p": 0.95,
+                "top_k": 40,
+                "max_output_tokens": 2048,
+            }
+        )
+        self.model_name = name
+        logger.info(f"LLMService initialized with model: {name}")
     
-    def generate_answer(
+    async def generate_answer(
         self,
         query: str,
         context_chunks: List[RerankedChunk],
@@ -93,7 +146,7 @@ class LLMService:
         logger.info("Generating answer with Gemini...")
         
         try:
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content_async(prompt)
             answer = response.text
             
             timing = {
@@ -114,7 +167,60 @@ class LLMService:
             logger.error(f"Error generating answer: {e}")
             raise
     
-    def generate_general_answer(
+    async def stream_answer(
+        self,
+        query: str,
+        context_chunks: List[RerankedChunk],
+        chat_history: Optional[List[ChatMessage]] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream an answer with inline citations as Gemini generates it.
+        
+        Args:
+            query: User query
+            context_chunks: Reranked chunks to use as context
+            chat_history: Previous conversation turns
+            
+        Yields:
+            ("token", text) for each generated piece, then a final
+            ("done", (answer, source_references, timing, token_usage))
+        """
+        start_time = time.time()
+        
+        # Build prompt
+        prompt = self._build_prompt(query, context_chunks, chat_history or [])
+        
+        # Generate response
+        logger.info("Streaming answer with Gemini...")
+        
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True)
+            
+            answer_parts = []
+            async for chunk in response:
+                text = chunk.text
+                if text:
+                    answer_parts.append(text)
+                    yield "token", text
+            answer = "".join(answer_parts)
+            
+            timing = {
+                'llm_ms': (time.time() - start_time) * 1000
+            }
+            
+            # Sources and usage need the full answer, so compute them last
+            sources = self._create_source_references(context_chunks)
+            token_usage = self._estimate_token_usage(prompt, answer)
+            
+            logger.info(f"✓ Answer streamed ({timing['llm_ms']:.0f}ms)")
+            
+            yield "done", (answer, sources, timing, token_usage)
+            
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            raise
+    
+    async def generate_general_answer(
         self,
         query: str
     ) -> Tuple[str, dict]:
@@ -142,7 +248,7 @@ Important:
 - Do not mention any specific documents or sources"""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content_async(prompt)
             answer = response.text
             
             timing = {
@@ -165,66 +271,43 @@ Important:
         context_chunks: List[RerankedChunk],
         chat_history: List[ChatMessage]
     ) -> str:
-        """Build the complete prompt for the LLM."""
+        """
+        Build the complete prompt for the LLM.
         
-        # System instructions
-        system_prompt = """You are a knowledgeable and friendly AI assistant that helps users understand their documents through engaging, conversational answers.
-
-CRITICAL RULES:
-1. Answer ONLY using information from the provided context
-2. ALWAYS use inline citations [1], [2], [3] after every claim or fact
-3. Write in a natural, conversational tone - like explaining to a colleague
-4. Structure longer answers with clear paragraphs for readability
-5. When relevant, provide examples or clarifications from the context
-6. If the context mentions links, naturally incorporate them: "You can learn more at [URL]"
-7. If the context mentions images, reference them: "as illustrated in the diagram [1]"
-8. If the context is insufficient, honestly say: "I don't have enough information in the uploaded documents to fully answer this."
-9. NEVER make up information beyond what's in the context
-
-FORMATTING GUIDELINES:
-- Use inline citations like [1], [2] immediately after each fact
-- Keep paragraphs focused (2-4 sentences each)
-- Use natural language, avoid robotic phrasing
-- When listing items, present them in sentence form with citations
-- Make your answer engaging and easy to follow
-
-CITATION EXAMPLES:
-✓ Good: "Deep learning uses neural networks with multiple layers [1]. Popular frameworks include TensorFlow and PyTorch [2]."
-✓ Good: "The system offers three main benefits: reduced hallucinations [1], up-to-date knowledge [2], and cost-effectiveness [3]."
-✗ Bad: "Deep learning uses neural networks. Popular frameworks include TensorFlow and PyTorch." (missing citations)
-"""
+        All pieces are appended to one list and joined once, so large chunk
+        texts are copied a single time instead of through nested joins and
+        f-strings.
+        """
+        parts = [SYSTEM_PROMPT, "\n\nCONTEXT FROM UPLOADED DOCUMENTS:\n"]
+        append = parts.append
         
         # Format context chunks
-        context_text = "\n\n".join([
-            f"[{i+1}] Source: {chunk.metadata.source}\n"
-            f"Title: {chunk.metadata.title}\n"
-            f"Text: {chunk.text}\n"
-            f"Links: {', '.join(chunk.metadata.links) if chunk.metadata.links else 'None'}\n"
-            f"Images: {', '.join(chunk.metadata.images) if chunk.metadata.images else 'None'}"
-            for i, chunk in enumerate(context_chunks)
-        ])
+        for i, chunk in enumerate(context_chunks):
+            if i:
+                append("\n\n")
+            metadata = chunk.metadata
+            append(f"[{i+1}] Source: {metadata.source}\nTitle: {metadata.title}\nText: ")
+            append(chunk.text)
+            append("\nLinks: ")
+            append(chunk.links_str)
+            append("\nImages: ")
+            append(chunk.images_str)
+        
+        append("\n")
         
         # Format chat history
-        history_text = ""
         if chat_history:
-            history_messages = []
+            append("\n\nPrevious conversation:")
             for msg in chat_history[-settings.chat_history_turns:]:
                 role = "User" if msg.role == "user" else "Assistant"
-                history_messages.append(f"{role}: {msg.content}")
-            history_text = "\n\nPrevious conversation:\n" + "\n".join(history_messages)
+                append(f"\n{role}: {msg.content}")
         
         # Complete prompt
-        full_prompt = f"""{system_prompt}
-
-CONTEXT FROM UPLOADED DOCUMENTS:
-{context_text}
-{history_text}
-
-CURRENT USER QUESTION: {query}
-
-YOUR ANSWER (conversational, well-structured, with inline citations):"""
+        append("\n\nCURRENT USER QUESTION: ")
+        append(query)
+        append("\n\nYOUR ANSWER (conversational, well-structured, with inline citations):")
         
-        return full_prompt
+        return "".join(parts)
     
     def _create_source_references(
         self,
@@ -247,7 +330,7 @@ YOUR ANSWER (conversational, well-structured, with inline citations):"""
             
             source = SourceReference(
                 id=source_id,
-                text=chunk.text[:200] + "..." if len(chunk.text) > 200 else chunk.text,
+                text=chunk.text_preview,
                 document=chunk.metadata.source,
                 links=chunk.metadata.links,
                 images=chunk.metadata.images,
@@ -290,6 +373,7 @@ YOUR ANSWER (conversational, well-structured, with inline citations):"""
 
 # Global instance
 _llm_service = None
+_llm_service_lock = threading.Lock()
 
 
 def get_llm_service() -> LLMService:
@@ -301,5 +385,8 @@ def get_llm_service() -> LLMService:
     """
     global _llm_service
     if _llm_service is None:
-        _llm_service = LLMService()
+        with _llm_service_lock:
+            # Re-check: another thread may have built it while we waited
+            if _llm_service is None:
+                _llm_service = LLMService()
     return _llm_service
\ No newline at end of file
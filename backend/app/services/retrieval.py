@@ -2,10 +2,14 @@
 Retrieval and reranking service.
 Pipeline: Query → Vector Search → Rerank → Return Top Results
 """
+import asyncio
 import time
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 import logging
+import threading
 import cohere
+import numpy as np
 
 from app.config import settings
 from app.services.embeddings import get_embedding_service
@@ -15,6 +19,102 @@ from app.models.schemas import RetrievedChunk, RerankedChunk
 logger = logging.getLogger(__name__)
 
 
+class SemanticCache:
+    """
+    In-memory LRU of answers keyed by normalized query embedding.
+    
+    A lookup hits when a cached query's cosine similarity with the new query
+    reaches the threshold, so repeated or near-duplicate questions skip
+    search, rerank and generation entirely.
+    """
+    
+    def __init__(self, max_entries: int = 1024, threshold: float = 0.97):
+        """
+        Initialize cache.
+        
+        Args:
+            max_entries: Maximum cached answers before LRU eviction
+            threshold: Minimum cosine similarity for a hit
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        
+        # Stacked unit vectors of all entries, rebuilt lazily after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[int] = []
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+    
+    def get(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached answer for a query embedding.
+        
+        Args:
+            embedding: Query embedding
+            
+        Returns:
+            Cached payload, or None on miss
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+        
+        with self._lock:
+            if not self._entries:
+                return None
+            
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k][0] for k in self._matrix_keys])
+            
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            return self._entries[key][1]
+    
+    def put(self, embedding: List[float], payload: Dict[str, Any]) -> None:
+        """
+        Store an answer payload for a query embedding.
+        
+        Args:
+            embedding: Query embedding
+            payload: Data to return on future hits
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return
+        
+        with self._lock:
+            self._entries[self._next_key] = (query, payload)
+            self._next_key += 1
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+    
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._matrix_keys = []
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class RetrievalService:
     """
     Service for retrieving and reranking relevant chunks.
@@ -31,12 +131,26 @@ class RetrievalService:
         self.embedding_service = get_embedding_service()
         self.vectorstore = get_vectorstore_service()
         
-        # Initialize Cohere reranker
-        self.cohere_client = cohere.Client(settings.cohere_api_key)
+        # Initialize Cohere reranker. The async client keeps one pooled
+        # aiohttp session, whereas the sync client opens a new HTTP session
+        # (and TLS handshake) for every call
+        self.cohere_client = cohere.AsyncClient(settings.cohere_api_key)
+        
+        # Answers for recently seen (or near-identical) queries
+        self.answer_cache = SemanticCache(
+            max_entries=settings.semantic_cache_size,
+            threshold=settings.semantic_cache_threshold
+        )
+        
+        # Cohere rankings: (query, sorted point ids, top_k) -> [(point_id, score)]
+        self._rerank_cache: "OrderedDict[Tuple[str, Tuple[str, ...], int], List[Tuple[str, float]]]" = OrderedDict()
+        self._rerank_cache_lock = threading.Lock()
+        self._rerank_cache_hits = 0
+        self._rerank_cache_lookups = 0
         
         logger.info("RetrievalService initialized with Cohere reranker")
     
-    def retrieve_and_rerank(
+    async def retrieve_and_rerank(
         self,
         query: str,
         top_k_retrieval: int = None,
@@ -45,6 +159,10 @@ class RetrievalService:
         """
         Retrieve relevant chunks and rerank them.
         
+        The embedding and search SDKs are blocking, so those calls run in a
+        worker thread; Cohere rerank uses its native async client. The event
+        loop stays free for other requests.
+        
         Args:
             query: User query
             top_k_retrieval: Number of chunks to retrieve (default from settings)
@@ -64,13 +182,14 @@ class RetrievalService:
         # Step 1: Embed query
         start_time = time.time()
         logger.info(f"Embedding query: '{query[:50]}...'")
-        query_embedding = self.embedding_service.embed_query(query)
+        query_embedding = await asyncio.to_thread(self.embedding_service.embed_query, query)
         timing['embedding_ms'] = (time.time() - start_time) * 1000
         
         # Step 2: Vector search
         start_time = time.time()
         logger.info(f"Retrieving top {top_k_retrieval} chunks from vector store")
-        retrieved_chunks = self.vectorstore.search(
+        retrieved_chunks = await asyncio.to_thread(
+            self.vectorstore.search,
             query_embedding=query_embedding,
             top_k=top_k_retrieval,
             score_threshold=None  # No threshold for initial retrieval
@@ -87,7 +206,7 @@ class RetrievalService:
         start_time = time.time()
         logger.info(f"Reranking with Cohere (top {top_k_rerank})")
         
-        reranked_chunks = self._rerank_with_cohere(
+        reranked_chunks = await self._rerank_with_cohere(
             query=query,
             chunks=retrieved_chunks,
             top_k=top_k_rerank
@@ -103,7 +222,7 @@ class RetrievalService:
         
         return reranked_chunks, timing
     
-    def _rerank_with_cohere(
+    async def _rerank_with_cohere(
         self,
         query: str,
         chunks: List[RetrievedChunk],
@@ -120,28 +239,43 @@ class RetrievalService:
         Returns:
             List of reranked chunks
         """
+        # Keyed on Qdrant point IDs: chunk_id can repeat (e.g. "" on
+        # points stored without one), point IDs cannot
+        cache_key = (query, tuple(sorted(c.point_id for c in chunks)), top_k)
+        
         try:
-            # Prepare documents for reranking
-            documents = [chunk.text for chunk in chunks]
+            ranking = self._get_cached_ranking(cache_key)
             
-            # Call Cohere Rerank API
-            rerank_response = self.cohere_client.rerank(
-                query=query,
-                documents=documents,
-                top_n=top_k,
-                model="rerank-english-v3.0"  # or rerank-multilingual-v3.0
-            )
+            if ranking is None:
+                # Prepare documents for reranking
+                documents = [chunk.text for chunk in chunks]
+                
+                # Call Cohere Rerank API
+                rerank_response = await self.cohere_client.rerank(
+                    query=query,
+                    documents=documents,
+                    top_n=top_k,
+                    model="rerank-english-v3.0"  # or rerank-multilingual-v3.0
+                )
+                
+                ranking = [
+                    (chunks[result.index].point_id, result.relevance_score)
+                    for result in rerank_response.results
+                ]
+                self._cache_ranking(cache_key, ranking)
             
-            # Convert to RerankedChunk objects
+            # Convert to RerankedChunk objects, using the live chunks so
+            # text and metadata are always current
+            chunks_by_point = {chunk.point_id: chunk for chunk in chunks}
             reranked_chunks = []
             
-            for result in rerank_response.results:
-                original_chunk = chunks[result.index]
+            for point_id, relevance_score in ranking:
+                original_chunk = chunks_by_point[point_id]
                 
                 reranked_chunk = RerankedChunk(
                     chunk_id=original_chunk.chunk_id,
                     text=original_chunk.text,
-                    score=result.relevance_score,  # Cohere rerank score
+                    score=relevance_score,  # Cohere rerank score
                     original_score=original_chunk.score,  # Original vector score
                     metadata=original_chunk.metadata
                 )
@@ -170,6 +304,71 @@ class RetrievalService:
                 for c in chunks[:top_k]
             ]
     
+    def _get_cached_ranking(
+        self,
+        cache_key: Tuple[str, Tuple[str, ...], int]
+    ) -> Optional[List[Tuple[str, float]]]:
+        """Look up a cached Cohere ranking and track the hit rate."""
+        with self._rerank_cache_lock:
+            self._rerank_cache_lookups += 1
+            ranking = self._rerank_cache.get(cache_key)
+            if ranking is None:
+                return None
+            
+            self._rerank_cache.move_to_end(cache_key)
+            self._rerank_cache_hits += 1
+        
+        logger.info(
+            f"Rerank cache hit "
+            f"(hit rate: {self._rerank_cache_hits}/{self._rerank_cache_lookups})"
+        )
+        return ranking
+    
+    def _cache_ranking(
+        self,
+        cache_key: Tuple[str, Tuple[str, ...], int],
+        ranking: List[Tuple[str, float]]
+    ) -> None:
+        """Store a Cohere ranking, evicting the least recently used entry."""
+        with self._rerank_cache_lock:
+            self._rerank_cache[cache_key] = ranking
+            if len(self._rerank_cache) > settings.rerank_cache_size:
+                self._rerank_cache.popitem(last=False)
+    
+    async def get_cached_answer(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a cached answer payload for a semantically similar query.
+        
+        Args:
+            query: User query
+            
+        Returns:
+            Cached payload, or None on miss
+        """
+        query_embedding = await asyncio.to_thread(self.embedding_service.embed_query, query)
+        return self.answer_cache.get(query_embedding)
+    
+    def cache_answer(self, query: str, payload: Dict[str, Any]) -> None:
+        """
+        Cache an answer payload for a query.
+        
+        Args:
+            query: User query
+            payload: Answer fields to return on future hits
+        """
+        self.answer_cache.put(self.embedding_service.embed_query(query), payload)
+    
+    def clear_answer_cache(self) -> None:
+        """Drop cached answers and rankings (e.g. after the document set changes)."""
+        self.answer_cache.clear()
+        with self._rerank_cache_lock:
+            self._rerank_cache.clear()
+        logger.info("Cleared semantic answer and rerank caches")
+    
+    async def close(self) -> None:
+        """Close the Cohere client's HTTP session."""
+        await self.cohere_client.close()
+    
     def check_context_relevance(
         self,
         reranked_chunks: List[RerankedChunk]
@@ -203,6 +402,7 @@ class RetrievalService:
 
 # Global instance
 _retrieval_service = None
+_retrieval_service_lock = threading.Lock()
 
 
 def get_retrieval_service() -> RetrievalService:
@@ -214,5 +414,16 @@ def get_retrieval_service() -> RetrievalService:
     """
     global _retrieval_service
     if _retrieval_service is None:
-        _retrieval_service = RetrievalService()
-    return _retrieval_service
\ No newline at end of file
+        with _retrieval_service_lock:
+            # Re-check: another thread may have built it while we waited
+            if _retrieval_service is None:
+                _retrieval_service = RetrievalService()
+    return _retrieval_service
+
+
+async def close_retrieval_service() -> None:
+    """Close the global RetrievalService's connections, if it was created."""
+    global _retrieval_service
+    if _retrieval_service is not None:
+        await _retrieval_service.close()
+        _retrieval_service = None
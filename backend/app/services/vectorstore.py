@@ -1,29 +1,71 @@
 """
 Qdrant vector store service for storing and retrieving document embeddings.
 """
-from typing import List, Dict, Any, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
 import os
 import logging
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
 import uuid
 
-from qdrant_client import QdrantClient
+import httpx
+import numpy as np
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import (
+    Batch,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Datatype,
     Distance,
     VectorParams,
-    PointStruct,
     Filter,
     FieldCondition,
+    HnswConfigDiff,
+    IsEmptyCondition,
     MatchValue,
+    OptimizersConfigDiff,
+    PayloadField,
     SearchParams,
-    PayloadSchemaType
+    PayloadSchemaType,
+    PayloadSelectorInclude,
+    QuantizationSearchParams,
+    QueryRequest,
+    Range,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType
 )
 
 from app.config import settings
 from app.models.schemas import ChunkMetadata, RetrievedChunk
+from app.services.chunk_store import get_chunk_text_store
+from app.utils.metadata import generate_source_id
 
 logger = logging.getLogger(__name__)
 
+# Indexed payload fields, so filters on them don't scan every point
+PAYLOAD_INDEXES = {
+    "source_id": PayloadSchemaType.INTEGER,  # Delete/count/search by document
+    "chunk_index": PayloadSchemaType.INTEGER,  # Range filter for pruning stale chunks
+    "chunk_id": PayloadSchemaType.KEYWORD,
+    "title": PayloadSchemaType.KEYWORD,
+    "created_at": PayloadSchemaType.DATETIME,
+}
+
+# Payload fields search results need to build RetrievedChunk objects;
+# bookkeeping fields (content_hash, chunk_index, counts) stay on the server.
+# "text" is absent when chunk text lives in the local ChunkTextStore.
+SEARCH_PAYLOAD_FIELDS = [
+    "text", "chunk_id", "source", "title", "section", "links", "images", "created_at"
+]
+
+# Namespace for deterministic point IDs derived from (source, chunk index)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c3c1e-5b8a-4a8e-9a51-6d1f0c9b7e21")
+
 
 class VectorStoreService:
     """
@@ -39,14 +81,18 @@ class VectorStoreService:
     def __init__(self):
         """Initialize Qdrant client."""
         logger.info(f"QDRANT_API_KEY present: {bool(os.getenv('QDRANT_API_KEY'))}")
-        self.client = QdrantClient(
-            url=settings.qdrant_url,
-            api_key=settings.qdrant_api_key,
-            https=True,
-            timeout=30
-        )
+        # Share the process-wide client (and its connections) with the routes
+        self.client = get_qdrant_client()
         self.collection_name = "rag_3072"
-        self.vector_size = settings.embedding_dimension
+        
+        # Local chunk text store (None: text is kept in the Qdrant payload)
+        self.text_store = get_chunk_text_store()
+        
+        # Nesting depth of bulk_mode() across concurrent ingestions
+        self._bulk_depth = 0
+        self._bulk_lock = threading.Lock()
+        self._saved_indexing_threshold: Optional[int] = None
+        self.vector_size = settings.vector_dimension
         
         logger.info(f"Initialized VectorStoreService: {settings.qdrant_url}")
         logger.info(f"Collection: {self.collection_name}")
@@ -65,32 +111,41 @@ class VectorStoreService:
             collections = self.client.get_collections().collections
             exists = any(c.name == self.collection_name for c in collections)
 
+            if exists and recreate:
+                logger.info(f"Deleting existing collection: {self.collection_name}")
+                self.client.delete_collection(self.collection_name)
+                exists = False
+
             if exists:
-                if recreate:
-                    logger.info(f"Deleting existing collection: {self.collection_name}")
-                    self.client.delete_collection(self.collection_name)
-                else:
-                    logger.info(f"Collection '{self.collection_name}' already exists")
-            else:    
+                logger.info(f"Collection '{self.collection_name}' already exists")
+            else:
                 logger.info(f"Creating collection: {self.collection_name}")
                 self.client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=self.vector_size,
                         distance=Distance.COSINE,
+                        on_disk=settings.qdrant_vectors_on_disk,
+                        datatype=Datatype.FLOAT16 if settings.qdrant_float16_vectors else None,
                 ),
+                    hnsw_config=HnswConfigDiff(
+                        m=settings.qdrant_hnsw_m,
+                        ef_construct=settings.qdrant_hnsw_ef_construct,
+                    ),
+                    quantization_config=self._quantization_config(),
             )
 
-        # ✅ CRITICAL: create payload index for filtering & deletion
-            try:
-                self.client.create_payload_index(
-                    collection_name=self.collection_name,
-                    field_name="source",
-                    field_schema=PayloadSchemaType.KEYWORD,
-             )
-                logger.info("✓ Payload index created for 'source'")
-            except Exception:
-                logger.info("✓ Payload index for 'source' already exists")
+        # ✅ CRITICAL: create payload indexes for filtering & deletion
+            for field_name, field_schema in PAYLOAD_INDEXES.items():
+                try:
+                    self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field_name,
+                        field_schema=field_schema,
+                    )
+                    logger.info(f"✓ Payload index created for '{field_name}'")
+                except Exception:
+                    logger.info(f"✓ Payload index for '{field_name}' already exists")
 
             return True
 
@@ -99,6 +154,58 @@ class VectorStoreService:
             return False 
 
 
+    def _quantization_config(self) -> Optional[Union[ScalarQuantization, BinaryQuantization]]:
+        """
+        Build the quantization config for new collections.
+        
+        Qdrant keeps the quantized vectors in RAM for search (4x smaller
+        than float32 for int8, 32x for binary) and rescores with the
+        original vectors.
+        
+        Returns:
+            Quantization config, or None if disabled in settings
+        """
+        if settings.qdrant_binary_quantization:
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=True)
+            )
+        if not settings.qdrant_scalar_quantization:
+            return None
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+
+    def _search_params(self, top_k: int, ef: Optional[int] = None) -> SearchParams:
+        """
+        Build per-query search params.
+        
+        HNSW ef scales with top_k rather than using the collection default,
+        so small retrievals don't pay for a wide graph traversal. With
+        quantization enabled, quantized candidates are oversampled and
+        rescored with the original vectors to keep recall.
+        
+        Args:
+            top_k: Number of results requested
+            ef: HNSW ef for this query (overrides the configured/adaptive value)
+            
+        Returns:
+            SearchParams for query_points
+        """
+        quantization = None
+        if settings.qdrant_scalar_quantization or settings.qdrant_binary_quantization:
+            quantization = QuantizationSearchParams(
+                rescore=True,
+                oversampling=settings.qdrant_rescore_oversampling,
+            )
+        return SearchParams(
+            hnsw_ef=ef or settings.qdrant_hnsw_ef or max(64, settings.qdrant_hnsw_ef_multiplier * top_k),
+            quantization=quantization,
+        )
+
     def collection_exists(self) -> bool:
         """
         Check if collection exists.
@@ -135,98 +242,469 @@ class VectorStoreService:
     def upsert_chunks(
         self,
         chunks: List[str],
-        embeddings: List[List[float]],
-        metadatas: List[Dict[str, Any]]
+        embeddings: Union[np.ndarray, List[List[float]]],
+        metadatas: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        parallel: Optional[int] = None
     ) -> int:
         """
         Upsert document chunks with embeddings and metadata.
         
         Args:
             chunks: List of text chunks
-            embeddings: List of embedding vectors
+            embeddings: Embedding matrix (n x dim) or list of vectors
+            metadatas: List of metadata dicts
+            batch_size: Points per upload request (default from settings)
+            parallel: Upsert requests in flight at once (default from settings)
+            
+        Returns:
+            Number of points upserted
+        """
+        columns = self._prepare_upload(chunks, embeddings, metadatas)
+        if columns is None:
+            return 0
+        vectors, point_ids, payloads = columns
+        
+        try:
+            # Text goes in before the points, so no search hit lacks it
+            if self.text_store is not None:
+                self._store_texts(chunks, point_ids, metadatas)
+            
+            # Upload to Qdrant in fixed-size batches instead of one huge
+            # request. Several batches are sent from threads on the shared
+            # client (not upload_collection's worker processes, which each
+            # re-import the app and open their own connection)
+            batch_size = batch_size or settings.qdrant_upsert_batch_size
+            starts = range(0, len(point_ids), batch_size)
+            
+            def upsert_batch(start: int) -> None:
+                end = start + batch_size
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=Batch(
+                        ids=point_ids[start:end],
+                        vectors=vectors[start:end].tolist(),
+                        payloads=payloads[start:end]
+                    ),
+                    wait=True
+                )
+            
+            workers = min(parallel or settings.qdrant_upsert_parallel, len(starts))
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # list() re-raises the first failed batch
+                    list(executor.map(upsert_batch, starts))
+            else:
+                for start in starts:
+                    upsert_batch(start)
+            logger.info(f"✓ Upserted {len(point_ids)} chunks to Qdrant")
+            return len(point_ids)
+            
+        except Exception as e:
+            logger.error(f"Error upserting chunks: {e}")
+            return 0
+    
+    async def aupsert_chunks(
+        self,
+        chunks: List[str],
+        embeddings: Union[np.ndarray, List[List[float]]],
+        metadatas: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        parallel: Optional[int] = None
+    ) -> int:
+        """
+        Upsert document chunks without blocking the event loop.
+        
+        Same as upsert_chunks, but sends the batches as concurrent upsert
+        requests on the shared AsyncQdrantClient, so the server can handle
+        other requests while Qdrant writes them.
+        
+        Args:
+            chunks: List of text chunks
+            embeddings: Embedding matrix (n x dim) or list of vectors
             metadatas: List of metadata dicts
+            batch_size: Points per upsert request (default from settings)
+            parallel: Upsert requests in flight at once (default from settings)
             
         Returns:
             Number of points upserted
         """
+        columns = self._prepare_upload(chunks, embeddings, metadatas)
+        if columns is None:
+            return 0
+        vectors, point_ids, payloads = columns
+        
+        try:
+            # Text goes in before the points, so no search hit lacks it
+            if self.text_store is not None:
+                await asyncio.to_thread(self._store_texts, chunks, point_ids, metadatas)
+            
+            # AsyncQdrantClient.upload_collection is a blocking call, so
+            # issue the batch upserts directly; the semaphore caps how many
+            # are in flight (gRPC multiplexes them over one connection)
+            client = get_async_qdrant_client()
+            batch_size = batch_size or settings.qdrant_upsert_batch_size
+            semaphore = asyncio.Semaphore(parallel or settings.qdrant_upsert_parallel)
+            
+            async def upsert_batch(start: int) -> None:
+                end = start + batch_size
+                async with semaphore:
+                    await client.upsert(
+                        collection_name=self.collection_name,
+                        points=Batch(
+                            ids=point_ids[start:end],
+                            vectors=vectors[start:end].tolist(),
+                            payloads=payloads[start:end]
+                        ),
+                        wait=True
+                    )
+            
+            await asyncio.gather(
+                *(upsert_batch(start) for start in range(0, len(point_ids), batch_size))
+            )
+            logger.info(f"✓ Upserted {len(point_ids)} chunks to Qdrant")
+            return len(point_ids)
+            
+        except Exception as e:
+            logger.error(f"Error upserting chunks: {e}")
+            return 0
+    
+    def _prepare_upload(
+        self,
+        chunks: List[str],
+        embeddings: Union[np.ndarray, List[List[float]]],
+        metadatas: List[Dict[str, Any]]
+    ) -> Optional[Tuple[np.ndarray, List[str], List[Dict[str, Any]]]]:
+        """
+        Validate an upsert and build its vectors, point IDs and payloads.
+        
+        Returns:
+            (vectors, point_ids, payloads) as parallel columns, or None if
+            there is nothing valid to upload
+        """
         logger.info(f"Preparing to upsert {len(chunks)} chunks with embeddings of length {len(embeddings)} and metadatas {len(metadatas)}")
-        if len(chunks) != len(embeddings) != len(metadatas):
+        if not (len(chunks) == len(embeddings) == len(metadatas)):
             raise ValueError("Chunks, embeddings, and metadatas must have same length")
         
         if not chunks:
-            return 0
-        for i, emb in enumerate(embeddings):
-            if len(emb) != self.vector_size:
-                logger.error(f"Embedding at index {i} has length {len(emb)}, expected {self.vector_size}")
-                return 0
+            return None
+        
+        # Single shape check over the whole batch
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.vector_size:
+            logger.error(f"Embeddings have shape {vectors.shape}, expected (*, {self.vector_size})")
+            return None
+        
+        # Build ids and payloads as parallel lists; vectors go up as the
+        # float32 matrix
+        created_at = datetime.now(timezone.utc).isoformat()
+        point_ids = [self._point_id(metadata) for metadata in metadatas]
+        # Chunks of a document share a source, so hash each one once
+        source_ids = {}
+        for metadata in metadatas:
+            source = metadata.get("source", "")
+            if source not in source_ids:
+                source_ids[source] = generate_source_id(source)
+        payloads = [
+            {
+                "chunk_id": metadata.get("chunk_id", ""),
+                "chunk_index": metadata.get("chunk_index"),
+                "source": metadata.get("source", ""),
+                "source_id": source_ids[metadata.get("source", "")],
+                "title": metadata.get("title", ""),
+                "section": metadata.get("section", ""),
+                "links": metadata.get("links", []),
+                "images": metadata.get("images", []),
+                "content_hash": metadata.get("content_hash", ""),
+                "links_count": metadata.get("links_count", 0),
+                "images_count": metadata.get("images_count", 0),
+                "created_at": created_at
+            }
+            for metadata in metadatas
+        ]
+        
+        # Without a local text store, the text rides along in the payload
+        if self.text_store is None:
+            for payload, chunk in zip(payloads, chunks):
+                payload["text"] = chunk
+        
+        return vectors, point_ids, payloads
+    
+    def _store_texts(
+        self,
+        chunks: List[str],
+        point_ids: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Write chunk texts to the local text store under their point IDs."""
+        self.text_store.put_many([
+            (point_id, metadata.get("source", ""), metadata.get("chunk_index"), chunk)
+            for point_id, metadata, chunk in zip(point_ids, metadatas, chunks)
+        ])
+    
+    @staticmethod
+    def _point_id(metadata: Dict[str, Any]) -> str:
+        """
+        Derive a deterministic point ID from a chunk's source and index, so
+        re-uploading a chunk overwrites it instead of duplicating it.
+        """
+        chunk_index = metadata.get("chunk_index", metadata.get("chunk_id", ""))
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{metadata.get('source', '')}:{chunk_index}"))
+    
+    @contextmanager
+    def bulk_mode(self) -> Iterator[None]:
+        """
+        Defer HNSW indexing while uploading many points.
+        
+        Sets the collection's indexing_threshold to 0 so Qdrant does not
+        build the graph alongside every batch, then restores the previous
+        threshold so it indexes everything in one pass. Nested and
+        concurrent uses share one bulk period.
+        
+        A previous threshold of 0 or unset (left by a crashed or concurrent
+        bulk upload, possibly in another process) is never restored as is;
+        the configured qdrant_indexing_threshold is used instead.
+        """
+        with self._bulk_lock:
+            if self._bulk_depth == 0:
+                self._begin_bulk()
+            self._bulk_depth += 1
         try:
-            # Create points
-            points = []
-            for chunk, embedding, metadata in zip(chunks, embeddings, metadatas):
-                # Generate unique ID
-                point_id = str(uuid.uuid4())
-                
-                # Create point
-                point = PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload={
-                        "text": chunk,
-                        "chunk_id": metadata.get("chunk_id", ""),
-                        "source": metadata.get("source", ""),
-                        "title": metadata.get("title", ""),
-                        "section": metadata.get("section", ""),
-                        "links": metadata.get("links", []),
-                        "images": metadata.get("images", []),
-                        "created_at": datetime.utcnow().isoformat()
-                    }
+            yield
+        finally:
+            with self._bulk_lock:
+                self._bulk_depth -= 1
+                if self._bulk_depth == 0:
+                    self._end_bulk()
+    
+    def _begin_bulk(self) -> None:
+        try:
+            info = self.client.get_collection(self.collection_name)
+            saved = info.config.optimizer_config.indexing_threshold
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                optimizer_config=OptimizersConfigDiff(indexing_threshold=0)
+            )
+            self._saved_indexing_threshold = saved or settings.qdrant_indexing_threshold
+            logger.info("Bulk mode: HNSW indexing paused")
+        except Exception as e:
+            logger.warning(f"Could not pause indexing for bulk upload: {e}")
+            self._saved_indexing_threshold = None
+    
+    def _end_bulk(self) -> None:
+        if self._saved_indexing_threshold is None:
+            return
+        try:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                optimizer_config=OptimizersConfigDiff(
+                    indexing_threshold=self._saved_indexing_threshold
                 )
-                points.append(point)
+            )
+            logger.info(
+                f"Bulk mode: HNSW indexing restored "
+                f"(indexing_threshold={self._saved_indexing_threshold})"
+            )
+        except Exception as e:
+            logger.error(f"Could not restore indexing after bulk upload: {e}")
+        finally:
+            self._saved_indexing_threshold = None
+    
+    def delete_by_source(self, source: str, wait: bool = True) -> bool:
+        """
+        Delete all chunks from a specific source document.
+        
+        Used to remove a document entirely (re-ingestion overwrites points
+        by ID and prunes leftovers with delete_stale_chunks).
+        
+        Args:
+            source: Source document name
+            wait: Wait for Qdrant to apply the delete. With False the call
+                returns once it is queued; later writes are still applied
+                after it
             
-            # Upsert to Qdrant
-            resp=self.client.upsert(
+        Returns:
+            True if successful
+        """
+        try:
+            # Delete points matching the source
+            self.client.delete(
                 collection_name=self.collection_name,
-                points=points
+                points_selector=self._source_filter(source),
+                wait=wait
             )
-            logger.info(f"Qdrant upsert response: {resp}")
-            logger.info(f"✓ Upserted {len(points)} chunks to Qdrant")
-            return len(points)
+            if self.text_store is not None:
+                self.text_store.delete_by_source(source)
+            
+            logger.info(f"✓ Deleted chunks from source: {source}")
+            return True
             
         except Exception as e:
-            logger.error(f"Error upserting chunks: {e}")
+            logger.error(f"Error deleting by source: {e}")
+            return False
+    
+    def _source_condition(self, source: str) -> FieldCondition:
+        """Condition matching a source by its integer source_id (indexed)."""
+        return FieldCondition(
+            key="source_id",
+            match=MatchValue(value=generate_source_id(source))
+        )
+    
+    def backfill_source_ids(self, batch_size: int = 1000) -> int:
+        """
+        Set source_id on points stored before it existed.
+        
+        Per-source filters match on source_id only, so legacy points must be
+        migrated once before they can be deleted, counted or pruned. Points
+        already carrying source_id are left alone, so this is cheap to rerun.
+        
+        Args:
+            batch_size: Points scrolled per round
+            
+        Returns:
+            Number of points updated
+        """
+        missing = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="source_id"))])
+        updated = 0
+        try:
+            while True:
+                points, _ = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=missing,
+                    limit=batch_size,
+                    with_payload=["source"],
+                    with_vectors=False
+                )
+                if not points:
+                    break
+                
+                by_source: Dict[str, List[Any]] = {}
+                for point in points:
+                    by_source.setdefault(point.payload.get("source", ""), []).append(point.id)
+                for source, ids in by_source.items():
+                    self.client.set_payload(
+                        collection_name=self.collection_name,
+                        payload={"source_id": generate_source_id(source)},
+                        points=ids,
+                        wait=True
+                    )
+                updated += len(points)
+            
+            if updated:
+                logger.info(f"✓ Backfilled source_id on {updated} points")
+            return updated
+            
+        except Exception as e:
+            logger.error(f"Error backfilling source_id: {e}")
+            return updated
+    
+    def _source_filter(self, source: str) -> Filter:
+        """Filter matching all chunks of a source (served by the payload index)."""
+        return Filter(must=[self._source_condition(source)])
+    
+    def count_by_source(self, source: str) -> int:
+        """
+        Count the chunks stored for a source document.
+        
+        Args:
+            source: Source document name
+            
+        Returns:
+            Number of points for the source
+        """
+        try:
+            return self.client.count(
+                collection_name=self.collection_name,
+                count_filter=self._source_filter(source),
+                exact=True
+            ).count
+        except Exception as e:
+            logger.error(f"Error counting points for source: {e}")
             return 0
     
-    def delete_by_source(self, source: str) -> bool:
+    def get_source_fingerprint(self, source: str) -> Optional[Dict[str, Any]]:
         """
-        Delete all chunks from a specific source document.
+        Look up the stored content hash, title and counts of a source.
         
-        This implements the "delete + reinsert" strategy for document updates.
+        Args:
+            source: Source document name
+            
+        Returns:
+            Dict with content_hash, title, chunk_count, links_count and
+            images_count, or None if the source is not stored (or the
+            lookup fails)
+        """
+        try:
+            source_filter = self._source_filter(source)
+            
+            # Every chunk of a source carries the same hash, so one point is enough
+            points, _ = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=source_filter,
+                limit=1,
+                with_payload=["content_hash", "title", "links_count", "images_count"],
+                with_vectors=False
+            )
+            if not points:
+                return None
+            
+            chunk_count = self.client.count(
+                collection_name=self.collection_name,
+                count_filter=source_filter,
+                exact=True
+            ).count
+            
+            return {
+                "content_hash": points[0].payload.get("content_hash", ""),
+                "title": points[0].payload.get("title", ""),
+                "chunk_count": chunk_count,
+                "links_count": points[0].payload.get("links_count", 0),
+                "images_count": points[0].payload.get("images_count", 0)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error looking up source fingerprint: {e}")
+            return None
+    
+    def delete_stale_chunks(self, source: str, chunk_count: int) -> bool:
+        """
+        Delete a source's chunks beyond its current chunk count.
+        
+        Also removes points without a chunk_index (stored before point IDs
+        were deterministic), which re-ingestion cannot overwrite. They
+        predate source_id too and are matched once backfill_source_ids ran.
         
         Args:
             source: Source document name
+            chunk_count: Number of chunks in the current version
             
         Returns:
             True if successful
         """
         try:
-            # Delete points matching the source
             self.client.delete(
                 collection_name=self.collection_name,
                 points_selector=Filter(
-                    must=[
+                    must=[self._source_condition(source)],
+                    should=[
                         FieldCondition(
-                            key="source",
-                            match=MatchValue(value=source)
+                            key="chunk_index",
+                            range=Range(gte=chunk_count)
+                        ),
+                        IsEmptyCondition(
+                            is_empty=PayloadField(key="chunk_index")
                         )
                     ]
                 )
             )
+            if self.text_store is not None:
+                self.text_store.delete_by_source(source, min_chunk_index=chunk_count)
             
-            logger.info(f"✓ Deleted chunks from source: {source}")
+            logger.info(f"✓ Deleted stale chunks from source: {source}")
             return True
             
         except Exception as e:
-            logger.error(f"Error deleting by source: {e}")
+            logger.error(f"Error deleting stale chunks: {e}")
             return False
     
     def search(
@@ -234,7 +712,9 @@ class VectorStoreService:
         query_embedding: List[float],
         top_k: int = 15,
         score_threshold: Optional[float] = None,
-        filter_source: Optional[str] = None
+        filter_source: Optional[str] = None,
+        include_fields: Optional[List[str]] = None,
+        ef: Optional[int] = None
     ) -> List[RetrievedChunk]:
         """
         Search for similar chunks using vector similarity.
@@ -244,6 +724,9 @@ class VectorStoreService:
             top_k: Number of results to return
             score_threshold: Minimum similarity score (optional)
             filter_source: Filter by source document (optional)
+            include_fields: Payload fields to fetch (default: SEARCH_PAYLOAD_FIELDS)
+            ef: HNSW ef for this query (default: adaptive to top_k). A small
+                ef is faster but only safe for a small top_k with checked recall
             
         Returns:
             List of retrieved chunks with scores and metadata
@@ -252,14 +735,7 @@ class VectorStoreService:
             # Build filter if needed
             query_filter = None
             if filter_source:
-                query_filter = Filter(
-                    must=[
-                        FieldCondition(
-                            key="source",
-                            match=MatchValue(value=filter_source)
-                        )
-                    ]
-                )
+                query_filter = self._source_filter(filter_source)
             
             # Search
             results = self.client.query_points(
@@ -268,29 +744,14 @@ class VectorStoreService:
                 limit=top_k,
                 score_threshold=score_threshold,
                 query_filter=query_filter,
-                with_payload=True
+                search_params=self._search_params(top_k, ef),
+                with_payload=PayloadSelectorInclude(
+                    include=include_fields or SEARCH_PAYLOAD_FIELDS
+                )
             )
             
             # Convert to RetrievedChunk objects
-            retrieved_chunks = []
-            for result in results.points:
-                metadata = ChunkMetadata(
-                    source=result.payload.get("source", ""),
-                    title=result.payload.get("title", ""),
-                    section=result.payload.get("section", ""),
-                    chunk_id=result.payload.get("chunk_id", ""),
-                    links=result.payload.get("links", []),
-                    images=result.payload.get("images", []),
-                    created_at=result.payload.get("created_at", "")
-                )
-                
-                chunk = RetrievedChunk(
-                    chunk_id=result.payload.get("chunk_id", ""),
-                    text=result.payload.get("text", ""),
-                    score=result.score,
-                    metadata=metadata
-                )
-                retrieved_chunks.append(chunk)
+            retrieved_chunks = self._to_retrieved_chunks(results.points)
             
             logger.info(f"✓ Retrieved {len(retrieved_chunks)} chunks (top_k={top_k})")
             return retrieved_chunks
@@ -299,6 +760,124 @@ class VectorStoreService:
             logger.error(f"Error searching vector store: {e}")
             return False
     
+    def warmup(self) -> bool:
+        """
+        Run one throwaway search to page in the collection's indexes.
+        
+        After a Qdrant restart the memory-mapped HNSW graph, quantized
+        vectors and payload indexes are not resident yet, so the first
+        real query would pay for the page faults.
+        
+        Returns:
+            True if the warmup query succeeded
+        """
+        try:
+            # Any unit vector will do; cosine can't normalize all zeros
+            probe = [1.0] + [0.0] * (self.vector_size - 1)
+            self.client.query_points(
+                collection_name=self.collection_name,
+                query=probe,
+                limit=1,
+                search_params=self._search_params(1, ef=16),
+                with_payload=False
+            )
+            logger.info(f"✓ Warmed up collection '{self.collection_name}'")
+            return True
+        except Exception as e:
+            logger.warning(f"Collection warmup failed: {e}")
+            return False
+    
+    def search_many(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 15,
+        score_threshold: Optional[float] = None,
+        filter_source: Optional[str] = None,
+        ef: Optional[int] = None
+    ) -> List[List[RetrievedChunk]]:
+        """
+        Run several vector searches in one request (e.g. query variants).
+        
+        Qdrant executes the queries in parallel server-side, so N queries
+        cost one round-trip instead of N.
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results to return per query
+            score_threshold: Minimum similarity score (optional)
+            filter_source: Filter by source document (optional)
+            ef: HNSW ef for these queries (default: adaptive to top_k)
+            
+        Returns:
+            List of retrieved chunks for each query, in input order
+            (empty lists on error)
+        """
+        if not query_embeddings:
+            return []
+        
+        try:
+            query_filter = self._source_filter(filter_source) if filter_source else None
+            search_params = self._search_params(top_k, ef)
+            payload_selector = PayloadSelectorInclude(include=SEARCH_PAYLOAD_FIELDS)
+            
+            requests = [
+                QueryRequest(
+                    query=query_embedding,
+                    limit=top_k,
+                    score_threshold=score_threshold,
+                    filter=query_filter,
+                    params=search_params,
+                    with_payload=payload_selector
+                )
+                for query_embedding in query_embeddings
+            ]
+            
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=requests
+            )
+            
+            results = [self._to_retrieved_chunks(response.points) for response in responses]
+            
+            logger.info(f"✓ Batch search: {len(results)} queries (top_k={top_k})")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error batch searching vector store: {e}")
+            return [[] for _ in query_embeddings]
+    
+    def _to_retrieved_chunks(self, points: List[Any]) -> List[RetrievedChunk]:
+        """Convert scored Qdrant points to RetrievedChunk objects."""
+        # Hydrate text from the local store in one query; points written
+        # before the store was enabled still carry it in their payload
+        texts = {}
+        if self.text_store is not None:
+            missing = [str(result.id) for result in points if "text" not in result.payload]
+            if missing:
+                texts = self.text_store.get_many(missing)
+        
+        retrieved_chunks = []
+        for result in points:
+            metadata = ChunkMetadata(
+                source=result.payload.get("source", ""),
+                title=result.payload.get("title", ""),
+                section=result.payload.get("section", ""),
+                chunk_id=result.payload.get("chunk_id", ""),
+                links=result.payload.get("links", []),
+                images=result.payload.get("images", []),
+                created_at=result.payload.get("created_at", "")
+            )
+            
+            chunk = RetrievedChunk(
+                chunk_id=result.payload.get("chunk_id", ""),
+                text=result.payload.get("text") or texts.get(str(result.id), ""),
+                score=result.score,
+                metadata=metadata,
+                point_id=str(result.id)
+            )
+            retrieved_chunks.append(chunk)
+        return retrieved_chunks
+    
     def count_points(self) -> int:
         """
         Count total points in collection.
@@ -314,8 +893,88 @@ class VectorStoreService:
             return 0
 
 
-# Global instance
+# Global instances
+_qdrant_client = None
+_qdrant_client_lock = threading.Lock()
+_async_qdrant_client = None
+_async_qdrant_client_lock = threading.Lock()
 _vectorstore_service = None
+_vectorstore_service_lock = threading.Lock()
+
+
+def get_qdrant_client() -> QdrantClient:
+    """
+    Get or create the shared QdrantClient instance.
+    
+    Reusing one client keeps its connection pool alive across requests
+    instead of paying a fresh TLS handshake per call. It is created on
+    first use, so each forked server worker opens its own connections.
+    
+    Returns:
+        QdrantClient instance
+    """
+    global _qdrant_client
+    if _qdrant_client is None:
+        with _qdrant_client_lock:
+            # Re-check: another thread may have built it while we waited
+            if _qdrant_client is None:
+                _qdrant_client = QdrantClient(**_qdrant_client_options())
+    return _qdrant_client
+
+
+def close_qdrant_client() -> None:
+    """Close the shared QdrantClient, if one was created."""
+    global _qdrant_client
+    with _qdrant_client_lock:
+        if _qdrant_client is not None:
+            _qdrant_client.close()
+            _qdrant_client = None
+
+
+def _qdrant_client_options() -> Dict[str, Any]:
+    """Connection options shared by the sync and async Qdrant clients."""
+    return dict(
+        url=settings.qdrant_url,
+        api_key=settings.qdrant_api_key,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        grpc_port=settings.qdrant_grpc_port,
+        # Ping idle gRPC connections so load balancers don't drop them
+        grpc_options={
+            "grpc.keepalive_time_ms": 30000,
+            "grpc.keepalive_permit_without_calls": 1,
+        },
+        # Keep REST connections (and their TLS sessions) alive for reuse
+        # across concurrent requests instead of reconnecting
+        limits=httpx.Limits(max_keepalive_connections=100),
+        timeout=60
+    )
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    Get or create the shared AsyncQdrantClient instance.
+    
+    Used from the event loop for writes that should not tie up a worker
+    thread. It must be used from the loop it was first called on.
+    
+    Returns:
+        AsyncQdrantClient instance
+    """
+    global _async_qdrant_client
+    if _async_qdrant_client is None:
+        with _async_qdrant_client_lock:
+            # Re-check: another thread may have built it while we waited
+            if _async_qdrant_client is None:
+                _async_qdrant_client = AsyncQdrantClient(**_qdrant_client_options())
+    return _async_qdrant_client
+
+
+async def close_async_qdrant_client() -> None:
+    """Close the shared AsyncQdrantClient, if one was created."""
+    global _async_qdrant_client
+    client, _async_qdrant_client = _async_qdrant_client, None
+    if client is not None:
+        await client.close()
 
 
 def get_vectorstore_service() -> VectorStoreService:
@@ -327,5 +986,8 @@ def get_vectorstore_service() -> VectorStoreService:
     """
     global _vectorstore_service
     if _vectorstore_service is None:
-        _vectorstore_service = VectorStoreService()
+        with _vectorstore_service_lock:
+            # Re-check: another thread may have built it while we waited
+            if _vectorstore_service is None:
+                _vectorstore_service = VectorStoreService()
     return _vectorstore_service
@@ -2,12 +2,17 @@
 Token-based text chunking with configurable size and overlap.
 Uses tiktoken for accurate token counting.
 """
+import re
 import tiktoken
 from typing import List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Above this many links, one regex pass per chunk beats a substring
+# search per link
+LINK_REGEX_MIN_LINKS = 32
+
 
 class TextChunker:
     """
@@ -57,27 +62,81 @@ class TextChunker:
         if not text or not text.strip():
             return []
         
-        # Encode text to tokens
-        tokens = self.encoding.encode(text)
+        # Encode text to tokens (special-token text is treated as plain text)
+        tokens = self.encoding.encode_ordinary(text)
         total_tokens = len(tokens)
         
         if total_tokens <= self.chunk_size:
             # Text is small enough to be a single chunk
             return [text]
         
-        chunks = []
+        # Decode each window back to text
+        chunks = [
+            self.encoding.decode(tokens[start:end])
+            for start, end in self._windows(total_tokens)
+        ]
+        
+        logger.info(f"Created {len(chunks)} chunks from {total_tokens} tokens")
+        return chunks
+    
+    def chunk_texts(self, texts: List[str], num_threads: int = 8) -> List[List[str]]:
+        """
+        Split several texts into overlapping chunks in one batch.
+        
+        Encoding and decoding each go through a single batched tiktoken
+        call, which runs on worker threads (tiktoken releases the GIL).
+        
+        Args:
+            texts: Input texts to chunk
+            num_threads: Threads for batched encode/decode
+            
+        Returns:
+            List of text chunks for each input text, in input order
+        """
+        token_lists = self.encoding.encode_ordinary_batch(texts, num_threads=num_threads)
+        
+        # Collect every window across all texts, remembering where each
+        # text's windows start
+        windows = []
+        offsets = []
+        for text, tokens in zip(texts, token_lists):
+            offsets.append(len(windows))
+            if len(tokens) > self.chunk_size:
+                windows.extend(tokens[start:end] for start, end in self._windows(len(tokens)))
+        offsets.append(len(windows))
+        
+        decoded = self.encoding.decode_batch(windows, num_threads=num_threads) if windows else []
+        
+        results = []
+        for i, (text, tokens) in enumerate(zip(texts, token_lists)):
+            if not text or not text.strip():
+                results.append([])
+            elif len(tokens) <= self.chunk_size:
+                # Text is small enough to be a single chunk
+                results.append([text])
+            else:
+                results.append(decoded[offsets[i]:offsets[i + 1]])
+        
+        logger.info(f"Created {sum(len(r) for r in results)} chunks from {len(texts)} texts")
+        return results
+    
+    def _windows(self, total_tokens: int) -> List[Tuple[int, int]]:
+        """
+        Compute (start, end) token offsets of overlapping chunk windows.
+        
+        Args:
+            total_tokens: Number of tokens in the text
+            
+        Returns:
+            List of (start, end) offsets
+        """
+        windows = []
         start = 0
         
         while start < total_tokens:
             # Define end position
             end = start + self.chunk_size
-            
-            # Extract chunk tokens
-            chunk_tokens = tokens[start:end]
-            
-            # Decode back to text
-            chunk_text = self.encoding.decode(chunk_tokens)
-            chunks.append(chunk_text)
+            windows.append((start, end))
             
             # Move start position with overlap
             # If this is the last possible chunk, break
@@ -85,10 +144,8 @@ class TextChunker:
                 break
             
             start = end - self.chunk_overlap
-        logger.info(f"DEBUG chunks count before embedding: {len(chunks)}")
-        logger.info(f"DEBUG first chunk length: {len(chunks[0]) if chunks else 'NONE'}")
-        logger.info(f"Created {len(chunks)} chunks from {total_tokens} tokens")
-        return chunks
+        
+        return windows
     
     def chunk_text_with_metadata(
         self,
@@ -134,19 +191,24 @@ class TextChunker:
         Returns:
             Number of tokens
         """
-        return len(self.encoding.encode(text))
+        return len(self.encoding.encode_ordinary(text))
     
-    def estimate_chunks(self, text: str) -> int:
+    def estimate_chunks(self, text: str, exact: bool = False) -> int:
         """
         Estimate number of chunks that will be created.
         
         Args:
             text: Input text
+            exact: Tokenize the text for an exact count; otherwise assume
+                ~4 characters per token and skip the BPE pass
             
         Returns:
             Estimated number of chunks
         """
-        total_tokens = self.count_tokens(text)
+        if exact:
+            total_tokens = self.count_tokens(text)
+        else:
+            total_tokens = max(1, len(text) // 4)
         
         if total_tokens <= self.chunk_size:
             return 1
@@ -160,6 +222,39 @@ class TextChunker:
         return 1 + additional_chunks
 
 
+def _links_per_chunk(chunks: List[str], links: List[str]) -> List[List[str]]:
+    """
+    Find which links occur in each chunk.
+    
+    Args:
+        chunks: Chunk texts
+        links: Links found in the document
+        
+    Returns:
+        Links contained in each chunk, in the order of `links`
+    """
+    if len(links) < LINK_REGEX_MIN_LINKS:
+        return [[link for link in links if link in chunk] for chunk in chunks]
+    
+    # Zero-width lookahead reports the longest link starting at every
+    # position (overlaps included); shorter links that are substrings of
+    # a match are added via `contained`
+    unique_links = sorted(set(links), key=len, reverse=True)
+    pattern = re.compile("(?=(%s))" % "|".join(map(re.escape, unique_links)))
+    contained = {
+        link: [other for other in unique_links if other in link]
+        for link in unique_links
+    }
+    
+    result = []
+    for chunk in chunks:
+        found = set()
+        for match in pattern.finditer(chunk):
+            found.update(contained[match.group(1)])
+        result.append([link for link in links if link in found])
+    return result
+
+
 def create_chunks_from_document(
     text: str,
     source: str,
@@ -187,18 +282,54 @@ def create_chunks_from_document(
     Returns:
         List of (chunk_text, full_metadata) tuples
     """
-    links = links or []
-    images = images or []
-    
     chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     chunks = chunker.chunk_text(text)
+    return _attach_metadata(chunks, source, title, links or [], images or [])
+
+
+def create_chunks_from_documents(
+    documents: List[Tuple[str, str, str, List[str], List[str]]],
+    chunk_size: int = 300,
+    chunk_overlap: int = 50
+) -> List[List[Tuple[str, dict]]]:
+    """
+    Chunk several documents at once, with the same chunks and metadata as
+    create_chunks_from_document.
     
-    chunks_with_metadata = []
+    All documents are tokenized with one batched encode and decode
+    (TextChunker.chunk_texts) instead of one pass per document.
     
-    for idx, chunk in enumerate(chunks):
-        # Assign links that appear in this chunk
-        chunk_links = [link for link in links if link in chunk]
+    Args:
+        documents: (text, source, title, links, images) tuples
+        chunk_size: Maximum tokens per chunk
+        chunk_overlap: Overlap in tokens
         
+    Returns:
+        List of (chunk_text, full_metadata) tuples for each document, in
+        input order
+    """
+    chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunk_lists = chunker.chunk_texts([text for text, _, _, _, _ in documents])
+    return [
+        _attach_metadata(chunks, source, title, links or [], images or [])
+        for chunks, (_, source, title, links, images) in zip(chunk_lists, documents)
+    ]
+
+
+def _attach_metadata(
+    chunks: List[str],
+    source: str,
+    title: str,
+    links: List[str],
+    images: List[str]
+) -> List[Tuple[str, dict]]:
+    """Pair each chunk with its metadata, assigning links and images."""
+    chunks_with_metadata = []
+    
+    # Assign links that appear in each chunk
+    links_per_chunk = _links_per_chunk(chunks, links)
+    
+    for idx, (chunk, chunk_links) in enumerate(zip(chunks, links_per_chunk)):
         # For images, we'll distribute them evenly across chunks
         # (since we don't have exact positions)
         chunk_images = []
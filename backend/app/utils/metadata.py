@@ -9,6 +9,18 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Markdown headings (# Heading, ## Heading, etc.); matched with pos/endpos
+# bounds on a single line, so no ^ anchor (it would only match at offset 0)
+_HEADING_RE = re.compile(r'(#{1,6})\s+(.+)$')
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w\s.-]')
+# ASCII fast path for sanitize_filename: one bytes.translate pass that drops
+# the characters the regex would remove and maps spaces to underscores
+_ASCII_FILENAME_TABLE = bytes.maketrans(b' ', b'_')
+_ASCII_FILENAME_DELETE = bytes(
+    c for c in range(128) if _UNSAFE_FILENAME_CHARS_RE.match(chr(c))
+)
+_URL_DOMAIN_RE = re.compile(r'https?://([^/]+)')
+
 
 def generate_chunk_id(text: str, source: str, index: int) -> str:
     """
@@ -24,8 +36,46 @@ def generate_chunk_id(text: str, source: str, index: int) -> str:
     """
     # Create hash from source and index for uniqueness
     content = f"{source}_{index}_{text[:100]}"
-    hash_obj = hashlib.md5(content.encode())
-    return f"chunk_{hash_obj.hexdigest()[:12]}"
+    hash_obj = hashlib.blake2b(content.encode(), digest_size=6)
+    return f"chunk_{hash_obj.hexdigest()}"
+
+
+def generate_chunk_ids(texts: List[str], source: str) -> List[str]:
+    """
+    Generate chunk IDs for a document's chunks in order.
+    
+    Same IDs as calling generate_chunk_id(text, source, index) per chunk,
+    with the hash constructor bound once for the whole batch.
+    
+    Args:
+        texts: Chunk texts
+        source: Source document
+        
+    Returns:
+        Chunk IDs, one per text
+    """
+    blake2b = hashlib.blake2b
+    return [
+        "chunk_" + blake2b(f"{source}_{index}_{text[:100]}".encode(), digest_size=6).hexdigest()
+        for index, text in enumerate(texts)
+    ]
+
+
+def generate_source_id(source: str) -> int:
+    """
+    Map a source document name to a stable integer ID.
+    
+    Stored as an integer payload field so per-document filters match on a
+    compact integer index instead of hashing keyword strings.
+    
+    Args:
+        source: Source document
+        
+    Returns:
+        Non-negative 63-bit integer (fits Qdrant's signed 64-bit payload ints)
+    """
+    digest = hashlib.blake2b(source.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & 0x7FFF_FFFF_FFFF_FFFF
 
 
 def extract_sections_from_text(text: str) -> List[Dict[str, Any]]:
@@ -43,23 +93,30 @@ def extract_sections_from_text(text: str) -> List[Dict[str, Any]]:
     """
     sections = []
     
-    # Pattern to match markdown headings (# Heading, ## Heading, etc.)
-    heading_pattern = r'^(#{1,6})\s+(.+)$'
-    
-    lines = text.split('\n')
     current_section = {
         "level": 0,
-        "title": "Introduction",
-        "content": []
+        "title": "Introduction"
     }
     
-    for line in lines:
-        match = re.match(heading_pattern, line)
+    # Section content is sliced from `text` by offsets instead of being
+    # collected line by line and re-joined
+    content_start = None  # Offset of the section's first content line
+    content_end = 0
+    
+    pos = 0
+    text_len = len(text)
+    while pos <= text_len:
+        line_end = text.find('\n', pos)
+        if line_end == -1:
+            line_end = text_len
+        
+        # Most lines are not headings; skip the regex for them
+        match = _HEADING_RE.match(text, pos, line_end) if text.startswith('#', pos) else None
         
         if match:
             # Save previous section if it has content
-            if current_section["content"]:
-                current_section["content"] = "\n".join(current_section["content"])
+            if content_start is not None:
+                current_section["content"] = text[content_start:content_end]
                 sections.append(current_section)
             
             # Start new section
@@ -68,15 +125,19 @@ def extract_sections_from_text(text: str) -> List[Dict[str, Any]]:
             
             current_section = {
                 "level": level,
-                "title": title,
-                "content": []
+                "title": title
             }
+            content_start = None
         else:
-            current_section["content"].append(line)
+            if content_start is None:
+                content_start = pos
+            content_end = line_end
+        
+        pos = line_end + 1
     
     # Add last section
-    if current_section["content"]:
-        current_section["content"] = "\n".join(current_section["content"])
+    if content_start is not None:
+        current_section["content"] = text[content_start:content_end]
         sections.append(current_section)
     
     logger.info(f"Extracted {len(sections)} sections from text")
@@ -189,10 +250,16 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename
     """
-    # Remove or replace unsafe characters
-    sanitized = re.sub(r'[^\w\s.-]', '', filename)
-    # Replace spaces with underscores
-    sanitized = sanitized.replace(' ', '_')
+    if filename.isascii():
+        # Remove unsafe characters and replace spaces in a single pass
+        sanitized = filename.encode('ascii').translate(
+            _ASCII_FILENAME_TABLE, _ASCII_FILENAME_DELETE
+        ).decode('ascii')
+    else:
+        # Unicode word characters are kept, so fall back to the regex
+        sanitized = _UNSAFE_FILENAME_CHARS_RE.sub('', filename)
+        # Replace spaces with underscores
+        sanitized = sanitized.replace(' ', '_')
     # Limit length
     if len(sanitized) > 200:
         sanitized = sanitized[:200]
@@ -211,7 +278,7 @@ def extract_domain_from_url(url: str) -> str:
         Domain name
     """
     # Simple regex to extract domain
-    match = re.search(r'https?://([^/]+)', url)
+    match = _URL_DOMAIN_RE.search(url)
     if match:
         return match.group(1)
     return url
\ No newline at end of file
@@ -1,19 +1,75 @@
 """
 Document parsers for extracting text, links, and images from various file formats.
 """
+import io
+import mmap
+import os
 import re
 import logging
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 
 from pypdf import PdfReader
 
+try:
+    import fitz  # PyMuPDF (optional): much faster PDF text extraction
+except ImportError:
+    fitz = None
+
+try:
+    import re2  # google-re2 (optional): linear-time DFA regex engine
+except ImportError:
+    re2 = None
+
 logger = logging.getLogger(__name__)
 
+# Per-document PDF extraction result: (page texts, annotation links,
+# text links, image references, page count, metadata title)
+PdfPages = Tuple[List[str], Dict[str, None], Dict[str, None], List[str], int, Optional[str]]
+
+# Patterns compiled once at import instead of looked up on every parse
+_URL_PATTERN = r"https?://[^\s<>{}\"|\\^`\[\]]+"
+# re2's \s is ASCII-only, so spell out every character Python's \s
+# matches; both engines then accept exactly the same URLs
+_RE2_URL_PATTERN = (
+    r"https?://[^\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\x{1680}\x{2000}-\x{200a}"
+    r"\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}<>{}\"|\\^`\[\]]+"
+)
+# URL scans run over whole documents, so use re2 when it is installed
+_URL_RE = re2.compile(_RE2_URL_PATTERN) if re2 is not None else re.compile(_URL_PATTERN)
+_MD_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+_MD_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(([^)]+)\)")
+_MD_TITLE_RE = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+_URL_TRAILING_PUNCT = ".,;:!?)"
+
+
+def _decode_text(data) -> str:
+    """Decode UTF-8 bytes with universal newlines, like open(..., "r")."""
+    text = str(data, "utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _read_text_file(file_path: str) -> str:
+    """
+    Read a UTF-8 text file with universal newlines, like open(..., "r").
+
+    Decodes straight from a memory map instead of going through the text
+    I/O layer, which skips an intermediate bytes copy of the whole file.
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _decode_text(mm)
+
 
 class ParsedDocument:
     """Container for parsed document content and metadata."""
 
+    __slots__ = ("text", "links", "images", "title")
+
     def __init__(self, text: str, links: List[str], images: List[str], title: str = ""):
         self.text = text
         self.links = links
@@ -32,45 +88,60 @@ class ParsedDocument:
 class DocumentParser:
     @staticmethod
     def parse_pdf(file_path: str) -> ParsedDocument:
-        try:
-            reader = PdfReader(file_path)
+        return DocumentParser._parse_pdf_source(file_path, Path(file_path).stem)
 
-            text_parts = []
-            all_links = []
-            image_references = []
+    @staticmethod
+    def parse_pdf_bytes(data: bytes, filename: str) -> ParsedDocument:
+        return DocumentParser._parse_pdf_source(io.BytesIO(data), Path(filename).stem)
 
+    @staticmethod
+    def parse_pdf_streaming(file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_num, page_text) one page at a time.
+
+        For very large PDFs whose consumer can work page by page: only the
+        current page's text is held, never the whole document. Pages
+        without extractable text are skipped and there is no OCR fallback;
+        use parse_pdf for links, images and the full document.
+        """
+        if fitz is not None:
+            with fitz.open(file_path) as doc:
+                for page_num, page in enumerate(doc, 1):
+                    page_text = page.get_text("text")
+                    if page_text:
+                        yield page_num, page_text
+        else:
+            reader = PdfReader(file_path)
             for page_num, page in enumerate(reader.pages, 1):
                 page_text = page.extract_text()
                 if page_text:
-                    text_parts.append(page_text)
+                    yield page_num, page_text
 
-                # Extract links
-                if "/Annots" in page:
-                    for annotation in page["/Annots"]:
-                        obj = annotation.get_object()
-                        if "/A" in obj and "/URI" in obj["/A"]:
-                            uri = obj["/A"]["/URI"]
-                            if uri and uri not in all_links:
-                                all_links.append(uri)
-
-                # Extract image references
-                if "/Resources" in page and "/XObject" in page["/Resources"]:
-                    xobjects = page["/Resources"]["/XObject"].get_object()
-                    for obj_name in xobjects:
-                        obj = xobjects[obj_name]
-                        if obj.get("/Subtype") == "/Image":
-                            image_references.append(f"page_{page_num}_{obj_name}")
+    @staticmethod
+    def _parse_pdf_source(
+        source: Union[str, BinaryIO], default_title: str
+    ) -> ParsedDocument:
+        try:
+            # PyMuPDF extracts in C; pypdf is the pure-Python fallback
+            if fitz is not None:
+                pages = DocumentParser._read_pdf_pymupdf(source)
+            else:
+                pages = DocumentParser._read_pdf_pypdf(source)
+            text_parts, all_links, text_links, image_references, page_count, title = pages
 
             full_text = "\n\n".join(text_parts)
 
             # OCR fallback
             if not full_text.strip():
-                logger.warning("No text found via pypdf. Falling back to OCR...")
+                logger.warning("No text found in PDF. Falling back to OCR...")
 
-                from pdf2image import convert_from_path
+                from pdf2image import convert_from_bytes, convert_from_path
                 import pytesseract
 
-                images = convert_from_path(file_path)
+                if isinstance(source, str):
+                    images = convert_from_path(source)
+                else:
+                    images = convert_from_bytes(source.getvalue())
                 ocr_text = []
 
                 for img in images:
@@ -79,86 +150,174 @@ class DocumentParser:
                         ocr_text.append(text)
 
                 full_text = "\n".join(ocr_text)
+                text_links = dict.fromkeys(DocumentParser._extract_urls_from_text(full_text))
 
-            metadata = reader.metadata
-            title = metadata.title if metadata and metadata.title else Path(file_path).stem
+            title = title or default_title
 
-            text_links = DocumentParser._extract_urls_from_text(full_text)
-            all_links.extend([l for l in text_links if l not in all_links])
+            all_links.update(text_links)
 
             logger.info(
-                f"Parsed PDF: {len(reader.pages)} pages, "
+                f"Parsed PDF: {page_count} pages, "
                 f"{len(all_links)} links, {len(image_references)} images"
             )
 
             return ParsedDocument(
                 text=full_text,
-                links=all_links,
+                links=list(all_links),
                 images=image_references,
                 title=title,
             )
 
         except Exception as e:
-            logger.error(f"Error parsing PDF {file_path}: {e}")
+            logger.error(f"Error parsing PDF {default_title}: {e}")
             raise
 
     @staticmethod
-    def parse_text(file_path: str) -> ParsedDocument:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
+    def _read_pdf_pymupdf(source: Union[str, BinaryIO]) -> PdfPages:
+        if isinstance(source, str):
+            doc = fitz.open(source)
+        else:
+            doc = fitz.open(stream=source.getvalue(), filetype="pdf")
+
+        with doc:
+            text_parts = []
+            # Insertion-ordered dict doubles as an O(1) seen-set
+            all_links = {}
+            text_links = {}
+            image_references = []
 
-            links = DocumentParser._extract_urls_from_text(text)
-            title = Path(file_path).stem
+            for page_num, page in enumerate(doc, 1):
+                page_text = page.get_text("text")
+                if page_text:
+                    text_parts.append(page_text)
+                    text_links.update(dict.fromkeys(
+                        DocumentParser._extract_urls_from_text(page_text)
+                    ))
 
-            logger.info(f"Parsed TXT: {len(text)} chars, {len(links)} links")
+                for link in page.get_links():
+                    if link.get("kind") == fitz.LINK_URI and link.get("uri"):
+                        all_links[link["uri"]] = None
 
-            return ParsedDocument(
-                text=text,
-                links=links,
-                images=[],
-                title=title,
-            )
+                # Same "page_<n>_/<name>" references the pypdf path produces
+                for image in page.get_images(full=True):
+                    image_references.append(f"page_{page_num}_/{image[7]}")
+
+            title = (doc.metadata or {}).get("title")
+            return text_parts, all_links, text_links, image_references, doc.page_count, title
+
+    @staticmethod
+    def _read_pdf_pypdf(source: Union[str, BinaryIO]) -> PdfPages:
+        reader = PdfReader(source)
+
+        text_parts = []
+        # Insertion-ordered dict doubles as an O(1) seen-set
+        all_links = {}
+        text_links = {}
+        image_references = []
+
+        for page_num, page in enumerate(reader.pages, 1):
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(page_text)
+                # Scan each page as it arrives rather than rescanning
+                # the joined document; URLs never span the page break
+                text_links.update(dict.fromkeys(
+                    DocumentParser._extract_urls_from_text(page_text)
+                ))
+
+            # Extract links; .get() returns raw (possibly indirect)
+            # objects, so each is resolved once instead of per lookup
+            annotations = page.get("/Annots")
+            if annotations:
+                for annotation in annotations.get_object():
+                    action = annotation.get_object().get("/A")
+                    if action is None:
+                        continue
+                    action = action.get_object()
+                    if "/URI" in action:
+                        uri = action["/URI"]
+                        if uri:
+                            all_links[uri] = None
+
+            # Extract image references
+            if "/Resources" in page and "/XObject" in page["/Resources"]:
+                xobjects = page["/Resources"]["/XObject"].get_object()
+                # One pass over items(); values may be indirect references
+                image_references.extend(
+                    f"page_{page_num}_{obj_name}"
+                    for obj_name, obj in xobjects.items()
+                    if obj.get_object().get("/Subtype") == "/Image"
+                )
+
+        metadata = reader.metadata
+        title = metadata.title if metadata and metadata.title else None
+        return text_parts, all_links, text_links, image_references, len(reader.pages), title
+
+    @staticmethod
+    def parse_text(file_path: str) -> ParsedDocument:
+        try:
+            text = _read_text_file(file_path)
+
+            return DocumentParser._parse_text_content(text, Path(file_path).stem)
 
         except Exception as e:
             logger.error(f"Error parsing text file {file_path}: {e}")
             raise
 
+    @staticmethod
+    def _parse_text_content(text: str, title: str) -> ParsedDocument:
+        links = DocumentParser._extract_urls_from_text(text)
+
+        logger.info(f"Parsed TXT: {len(text)} chars, {len(links)} links")
+
+        return ParsedDocument(
+            text=text,
+            links=links,
+            images=[],
+            title=title,
+        )
+
     @staticmethod
     def parse_markdown(file_path: str) -> ParsedDocument:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
+            text = _read_text_file(file_path)
 
-            md_links = re.findall(r"\[([^\]]+)\]\(([^)]+)\)", text)
-            links = [url for _, url in md_links if url.startswith("http")]
+            return DocumentParser._parse_markdown_content(text, Path(file_path).stem)
 
-            md_images = re.findall(r"!\[([^\]]*)\]\(([^)]+)\)", text)
-            images = [img_path for _, img_path in md_images]
+        except Exception as e:
+            logger.error(f"Error parsing markdown file {file_path}: {e}")
+            raise
 
-            text_links = DocumentParser._extract_urls_from_text(text)
-            links.extend([l for l in text_links if l not in links])
+    @staticmethod
+    def _parse_markdown_content(text: str, default_title: str) -> ParsedDocument:
+        md_links = _MD_LINK_RE.findall(text)
+        links = [url for _, url in md_links if url.startswith(("http://", "https://"))]
 
-            title = Path(file_path).stem
-            heading_match = re.search(r"^#\s+(.+)$", text, re.MULTILINE)
-            if heading_match:
-                title = heading_match.group(1).strip()
+        md_images = _MD_IMAGE_RE.findall(text)
+        images = [img_path for _, img_path in md_images]
 
-            logger.info(
-                f"Parsed Markdown: {len(text)} chars, "
-                f"{len(links)} links, {len(images)} images"
-            )
+        seen_links = set(links)
+        links.extend(
+            link for link in DocumentParser._extract_urls_from_text(text)
+            if link not in seen_links
+        )
 
-            return ParsedDocument(
-                text=text,
-                links=links,
-                images=images,
-                title=title,
-            )
+        title = default_title
+        heading_match = _MD_TITLE_RE.search(text)
+        if heading_match:
+            title = heading_match.group(1).strip()
 
-        except Exception as e:
-            logger.error(f"Error parsing markdown file {file_path}: {e}")
-            raise
+        logger.info(
+            f"Parsed Markdown: {len(text)} chars, "
+            f"{len(links)} links, {len(images)} images"
+        )
+
+        return ParsedDocument(
+            text=text,
+            links=links,
+            images=images,
+            title=title,
+        )
 
     @staticmethod
     def parse_raw_text(text: str, title: str = "Pasted Text") -> ParsedDocument:
@@ -175,30 +334,50 @@ class DocumentParser:
 
     @staticmethod
     def _extract_urls_from_text(text: str) -> List[str]:
-        url_pattern = r"https?://[^\s<>{}\"|\\^`\[\]]+"
-        urls = re.findall(url_pattern, text)
+        # Every match contains "http"; a substring check is far cheaper
+        # than a regex scan on the common no-URL case
+        if "http" not in text:
+            return []
+
+        # dict.fromkeys dedupes while keeping first-seen order
+        return list(dict.fromkeys(
+            url.rstrip(_URL_TRAILING_PUNCT) for url in _URL_RE.findall(text)
+        ))
 
-        seen = set()
-        unique_urls = []
+    @staticmethod
+    def parse_bytes(data: bytes, filename: str) -> ParsedDocument:
+        """Parse file content already held in memory (e.g. an upload)."""
+        path = Path(filename)
+        extension = path.suffix.lower()
 
-        for url in urls:
-            url = url.rstrip(".,;:!?)")
-            if url not in seen:
-                seen.add(url)
-                unique_urls.append(url)
+        try:
+            if extension == ".pdf":
+                return DocumentParser.parse_pdf_bytes(data, filename)
+            elif extension == ".txt":
+                return DocumentParser._parse_text_content(_decode_text(data), path.stem)
+            elif extension in {".md", ".markdown"}:
+                return DocumentParser._parse_markdown_content(_decode_text(data), path.stem)
+            else:
+                raise ValueError(f"Unsupported file type: {extension}")
 
-        return unique_urls
+        except Exception as e:
+            logger.error(f"Error parsing {filename}: {e}")
+            raise
 
     @staticmethod
     def parse_file(file_path: str) -> ParsedDocument:
-        path = Path(file_path)
-        extension = path.suffix.lower()
+        extension = Path(file_path).suffix.lower()
 
-        if extension == ".pdf":
-            return DocumentParser.parse_pdf(file_path)
-        elif extension == ".txt":
-            return DocumentParser.parse_text(file_path)
-        elif extension in {".md", ".markdown"}:
-            return DocumentParser.parse_markdown(file_path)
-        else:
+        parser = _FILE_PARSERS.get(extension)
+        if parser is None:
             raise ValueError(f"Unsupported file type: {extension}")
+        return parser(file_path)
+
+
+# File parser for each supported extension
+_FILE_PARSERS = {
+    ".pdf": DocumentParser.parse_pdf,
+    ".txt": DocumentParser.parse_text,
+    ".md": DocumentParser.parse_markdown,
+    ".markdown": DocumentParser.parse_markdown,
+}
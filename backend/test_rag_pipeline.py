@@ -1,6 +1,7 @@
 """
 Test the complete RAG pipeline: Ingest → Query → Retrieve → Rerank → Answer
 """
+import asyncio
 import sys
 from pathlib import Path
 
@@ -12,8 +13,8 @@ from app.services.llm import get_llm_service
 from app.models.schemas import ChatMessage
 
 
-def test_complete_rag_pipeline():
-    """Test the complete RAG pipeline end-to-end."""
+async def _run_pipeline():
+    """Run the complete RAG pipeline end-to-end."""
     
     print("\n" + "="*70)
     print("COMPLETE RAG PIPELINE TEST")
@@ -96,7 +97,7 @@ Learn more at https://python.langchain.com/docs/use_cases/question_answering/
     query = "What are the benefits of RAG systems?"
     print(f"Query: '{query}'")
     
-    reranked_chunks, timing = retrieval_service.retrieve_and_rerank(query)
+    reranked_chunks, timing = await retrieval_service.retrieve_and_rerank(query)
     
     print(f"\n✓ Retrieved: {len(reranked_chunks)} chunks")
     print(f"✓ Retrieval time: {timing.get('retrieval_ms', 0):.0f}ms")
@@ -115,7 +116,7 @@ Learn more at https://python.langchain.com/docs/use_cases/question_answering/
     
     llm_service = get_llm_service()
     
-    answer, sources, llm_timing, token_usage = llm_service.generate_answer(
+    answer, sources, llm_timing, token_usage = await llm_service.generate_answer(
         query=query,
         context_chunks=reranked_chunks,
         chat_history=[]
@@ -155,9 +156,9 @@ Learn more at https://python.langchain.com/docs/use_cases/question_answering/
     followup_query = "Can you explain more about the cost-effectiveness?"
     print(f"Follow-up query: '{followup_query}'")
     
-    reranked_chunks2, _ = retrieval_service.retrieve_and_rerank(followup_query)
+    reranked_chunks2, _ = await retrieval_service.retrieve_and_rerank(followup_query)
     
-    answer2, sources2, _, _ = llm_service.generate_answer(
+    answer2, sources2, _, _ = await llm_service.generate_answer(
         query=followup_query,
         context_chunks=reranked_chunks2,
         chat_history=chat_history
@@ -172,7 +173,7 @@ Learn more at https://python.langchain.com/docs/use_cases/question_answering/
     irrelevant_query = "What is the recipe for chocolate cake?"
     print(f"Query: '{irrelevant_query}'")
     
-    reranked_chunks3, _ = retrieval_service.retrieve_and_rerank(irrelevant_query)
+    reranked_chunks3, _ = await retrieval_service.retrieve_and_rerank(irrelevant_query)
     
     has_context = retrieval_service.check_context_relevance(reranked_chunks3)
     
@@ -180,7 +181,7 @@ Learn more at https://python.langchain.com/docs/use_cases/question_answering/
     
     if not has_context:
         print("✓ Correctly detected irrelevant query!")
-        general_answer, _ = llm_service.generate_general_answer(irrelevant_query)
+        general_answer, _ = await llm_service.generate_general_answer(irrelevant_query)
         print(f"\nGeneral answer:\n{general_answer[:200]}...")
     
     # Summary
@@ -198,6 +199,11 @@ Learn more at https://python.langchain.com/docs/use_cases/question_answering/
     print("="*70 + "\n")
 
 
+def test_complete_rag_pipeline():
+    """Test the complete RAG pipeline end-to-end."""
+    asyncio.run(_run_pipeline())
+
+
 if __name__ == "__main__":
     try:
         test_complete_rag_pipeline()
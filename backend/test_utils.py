@@ -1,16 +1,18 @@
 """
-Test script for parsing and chunking utilities.
+Test script for parsing, chunking and other network-free utilities.
 Run this to verify the utilities work correctly.
 """
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add app to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.utils.parsers import DocumentParser
-from app.utils.chunking import TextChunker, create_chunks_from_document
-from app.utils.metadata import generate_chunk_id, extract_sections_from_text
+from app.utils.chunking import LINK_REGEX_MIN_LINKS, TextChunker, _links_per_chunk, create_chunks_from_document
+from app.utils.metadata import generate_chunk_id, generate_source_id, extract_sections_from_text
 
 
 def test_text_parsing():
@@ -153,6 +155,156 @@ Subsection content.
         print(f"    Content length: {len(section['content'])} chars")
 
 
+def test_source_id_generation():
+    """Test source ID generation."""
+    print("\n" + "="*60)
+    print("TEST 6: Source ID Generation")
+    print("="*60)
+    
+    source_id = generate_source_id("document.pdf")
+    print(f"✓ Generated source ID: {source_id}")
+    
+    # Stored on every point, so it must never change between releases
+    assert source_id == 4929503686770193642, "Source ID changed for the same name"
+    assert generate_source_id("document.pdf") == source_id, "Source ID should be deterministic"
+    print("✓ Source ID is stable")
+    
+    # Qdrant payload integers are signed 64-bit
+    for source in ["", "document.pdf", "report (final).md", "ünïcode.txt"]:
+        assert 0 <= generate_source_id(source) < 2**63, f"Source ID out of range for {source!r}"
+    print("✓ Source IDs fit in a signed 64-bit integer")
+    
+    assert generate_source_id("a.pdf") != generate_source_id("b.pdf"), "IDs should differ per source"
+    print("✓ Different sources get different IDs")
+
+
+def test_links_per_chunk():
+    """Test regex link assignment against a per-link substring scan."""
+    print("\n" + "="*60)
+    print("TEST 7: Link Assignment")
+    print("="*60)
+    
+    # Enough links for the regex path, with links that contain each other
+    # and a duplicate
+    links = [f"https://example.com/page{i}" for i in range(LINK_REGEX_MIN_LINKS)]
+    links += ["https://example.com/page1/details", "https://example.com", links[3]]
+    chunks = [
+        "See https://example.com/page1/details and https://example.com/page12.",
+        "Nothing to see here.",
+        "https://example.com/page3https://example.com/page30 back to back",
+        "Just the site: https://example.com",
+    ]
+    
+    expected = [[link for link in links if link in chunk] for chunk in chunks]
+    result = _links_per_chunk(chunks, links)
+    
+    assert result == expected, "Regex assignment should match the per-link scan"
+    for chunk, chunk_links in zip(chunks, result):
+        print(f"✓ {len(chunk_links)} links in: {chunk[:50]}...")
+
+
+def test_semantic_cache():
+    """Test the semantic answer cache."""
+    print("\n" + "="*60)
+    print("TEST 8: Semantic Answer Cache")
+    print("="*60)
+    
+    # Service modules need API settings in .env, so import them here
+    from app.services.retrieval import SemanticCache
+    
+    cache = SemanticCache(max_entries=2, threshold=0.95)
+    cache.put([1.0, 0.0, 0.0], {"answer": "x"})
+    
+    # Scale doesn't matter, only direction
+    assert cache.get([2.0, 0.01, 0.0]) == {"answer": "x"}, "Near-identical query should hit"
+    assert cache.get([0.7, 0.7, 0.0]) is None, "Query below the threshold should miss"
+    assert cache.get([0.0, 0.0, 0.0]) is None, "Zero vector should miss"
+    print("✓ Threshold hit/miss")
+    
+    # A hit refreshes an entry, so the other one is evicted first
+    cache.put([0.0, 1.0, 0.0], {"answer": "y"})
+    assert cache.get([1.0, 0.0, 0.0]) == {"answer": "x"}
+    cache.put([0.0, 0.0, 1.0], {"answer": "z"})
+    assert len(cache) == 2, "Cache should stay within max_entries"
+    assert cache.get([0.0, 1.0, 0.0]) is None, "Least recently used entry should be evicted"
+    assert cache.get([1.0, 0.0, 0.0]) == {"answer": "x"}
+    assert cache.get([0.0, 0.0, 1.0]) == {"answer": "z"}
+    print("✓ LRU eviction")
+    
+    cache.clear()
+    assert len(cache) == 0 and cache.get([1.0, 0.0, 0.0]) is None, "clear() should drop everything"
+    print("✓ clear()")
+
+
+def test_rate_limiter():
+    """Test token-bucket pacing of embedding calls."""
+    print("\n" + "="*60)
+    print("TEST 9: Embedding Rate Limiter")
+    print("="*60)
+    
+    from app.services.embeddings import RateLimiter
+    
+    # 1200/minute = 20 tokens per second, starting with a full bucket
+    limiter = RateLimiter(1200)
+    
+    start = time.monotonic()
+    limiter.acquire(1200)
+    assert time.monotonic() - start < 0.05, "A full bucket should not wait"
+    print("✓ Full bucket drained without waiting")
+    
+    start = time.monotonic()
+    limiter.acquire(2)
+    waited = time.monotonic() - start
+    assert 0.08 <= waited < 0.5, f"Expected ~0.1s wait for 2 tokens at 20/s, got {waited:.3f}s"
+    print(f"✓ Empty bucket paced the next call ({waited * 1000:.0f}ms)")
+    
+    # Requests bigger than the bucket are capped rather than blocking forever
+    start = time.monotonic()
+    RateLimiter(60).acquire(10**6)
+    assert time.monotonic() - start < 0.05, "Oversized request should pass on a full bucket"
+    print("✓ Oversized request capped at bucket capacity")
+
+
+def test_batching_embedder():
+    """Test coalescing of concurrent embedding requests."""
+    print("\n" + "="*60)
+    print("TEST 10: Embedding Request Batching")
+    print("="*60)
+    
+    from app.services.embeddings import BatchingEmbedder
+    
+    batches = []
+    
+    def fake_embed(texts):
+        # "caller-item" -> [caller, item], so results can be traced back
+        batches.append(list(texts))
+        return [[float(part) for part in text.split("-")] for text in texts]
+    
+    embedder = BatchingEmbedder(fake_embed, max_batch=4, max_wait_ms=100)
+    sizes = [1, 2, 1, 2, 1, 2]
+    
+    def submit(caller):
+        return embedder.submit([f"{caller}-{item}" for item in range(sizes[caller])])
+    
+    with ThreadPoolExecutor(max_workers=len(sizes)) as executor:
+        results = list(executor.map(submit, range(len(sizes))))
+    
+    for caller, result in enumerate(results):
+        expected = [[float(caller), float(item)] for item in range(sizes[caller])]
+        assert result == expected, f"Caller {caller} got another caller's embeddings"
+    print("✓ Each caller got its own embeddings, in order")
+    
+    assert all(len(batch) <= 4 for batch in batches), "Batch exceeded max_batch"
+    assert len(batches) < len(sizes), "Concurrent requests should share batches"
+    print(f"✓ {len(sizes)} requests sent as {len(batches)} batches")
+    
+    try:
+        embedder.submit(["x"] * 5)
+        raise AssertionError("Oversized submit should be rejected")
+    except ValueError:
+        print("✓ Oversized submit rejected")
+
+
 if __name__ == "__main__":
     print("\n" + "="*60)
     print("TESTING PARSING AND CHUNKING UTILITIES")
@@ -164,6 +316,11 @@ if __name__ == "__main__":
         test_chunks_with_metadata()
         test_chunk_id_generation()
         test_section_extraction()
+        test_source_id_generation()
+        test_links_per_chunk()
+        test_semantic_cache()
+        test_rate_limiter()
+        test_batching_embedder()
         
         print("\n" + "="*60)
         print("✅ ALL TESTS PASSED!")
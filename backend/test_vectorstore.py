@@ -2,14 +2,19 @@
 Test script for embeddings and vector store integration.
 This script requires valid API keys in .env file.
 """
+import asyncio
 import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 # Add app to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from qdrant_client.models import PointStruct
+
 from app.services.embeddings import get_embedding_service
-from app.services.vectorstore import get_vectorstore_service
-from app.utils.metadata import generate_chunk_id
+from app.services.vectorstore import PAYLOAD_INDEXES, get_vectorstore_service
+from app.utils.metadata import generate_chunk_ids
 
 
 def test_embedding_service():
@@ -50,8 +55,17 @@ def test_vectorstore_connection():
     vectorstore = get_vectorstore_service()
 
     print("✓ Recreating collection (ensures payload index exists)...")
-    vectorstore.create_collection(recreate=True)
+    assert vectorstore.create_collection(recreate=True), "Collection recreate failed"
     print("✓ Collection recreated successfully")
+    
+    # Filters and deletes by these fields should hit payload indexes
+    payload_schema = vectorstore.client.get_collection(vectorstore.collection_name).payload_schema
+    missing = set(PAYLOAD_INDEXES) - set(payload_schema)
+    assert not missing, f"Missing payload indexes: {sorted(missing)}"
+    print(f"✓ Payload indexes: {', '.join(sorted(payload_schema))}")
+    
+    assert vectorstore.warmup(), "Warmup query failed"
+    print("✓ Warmup query succeeded")
 
 
 def test_upsert_and_search():
@@ -63,10 +77,9 @@ def test_upsert_and_search():
     embedding_service = get_embedding_service()
     vectorstore = get_vectorstore_service()
     
-    vectorstore.delete_by_source("test_doc.txt")
-    # Ensure collection exists
-    if not vectorstore.collection_exists():
-        vectorstore.create_collection()
+    # Clean slate in one round-trip; the collection was recreated in test 2
+    # and the upsert below is queued after this delete
+    vectorstore.delete_by_source("test_doc.txt", wait=False)
     
     # Sample data
     chunks = [
@@ -75,15 +88,23 @@ def test_upsert_and_search():
         "Chunking is important for managing context window limits."
     ]
     
-    # Generate embeddings
+    query = "How do RAG systems work?"
+    
+    # Generate embeddings; chunks and query need different task types, so
+    # they are separate requests, sent concurrently instead of back to back
     print("✓ Generating embeddings...")
-    embeddings = embedding_service.embed_batch(chunks)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        embeddings_future = executor.submit(embedding_service.embed_batch, chunks)
+        query_future = executor.submit(embedding_service.embed_query, query)
+        embeddings = embeddings_future.result()
+        query_embedding = query_future.result()
     
     # Create metadata
     metadatas = []
-    for i, chunk in enumerate(chunks):
+    chunk_ids = generate_chunk_ids(chunks, "test_doc.txt")
+    for chunk_id in chunk_ids:
         metadata = {
-            "chunk_id": generate_chunk_id(chunk, "test_doc.txt", i),
+            "chunk_id": chunk_id,
             "source": "test_doc.txt",
             "title": "Test Document",
             "section": "Introduction",
@@ -98,13 +119,15 @@ def test_upsert_and_search():
     print(f"✓ Upserted {count} chunks")
     
     # Search
-    query = "How do RAG systems work?"
     print(f"\n✓ Searching for: '{query}'")
     
-    query_embedding = embedding_service.embed_query(query)
-    results = vectorstore.search(query_embedding, top_k=2)
+    # A tiny ef is enough for top_k=2; the assert below checks recall
+    results = vectorstore.search(query_embedding, top_k=2, ef=16)
     
     print(f"✓ Found {len(results)} results:")
+    # Quantized search rescoring with the original vectors must keep the
+    # RAG chunk on top
+    assert results and results[0].text == chunks[0], "Expected the RAG chunk as top result"
     for i, result in enumerate(results):
         print(f"\n  Result {i+1}:")
         print(f"  - Score: {result.score:.4f}")
@@ -120,6 +143,22 @@ def test_delete_by_source():
     
     vectorstore = get_vectorstore_service()
     
+    # A point stored before source_id existed is deleted once backfilled
+    print("✓ Adding a legacy point without source_id...")
+    vectorstore.client.upsert(
+        collection_name=vectorstore.collection_name,
+        points=[
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=[1.0] + [0.0] * (vectorstore.vector_size - 1),
+                payload={"text": "Legacy chunk.", "source": "test_doc.txt"}
+            )
+        ]
+    )
+    backfilled = vectorstore.backfill_source_ids()
+    assert backfilled >= 1, "Legacy point was not backfilled"
+    print(f"✓ Backfilled source_id on {backfilled} points")
+    
     print("✓ Points before deletion:")
     count_before = vectorstore.count_points()
     print(f"  - Total points: {count_before}")
@@ -132,6 +171,22 @@ def test_delete_by_source():
     count_after = vectorstore.count_points()
     print(f"  - Total points: {count_after}")
     print(f"  - Deleted: {count_before - count_after}")
+    
+    remaining = vectorstore.count_by_source("test_doc.txt")
+    assert remaining == 0, f"{remaining} points of 'test_doc.txt' left after delete"
+
+
+async def run_independent_tests():
+    """
+    Run the embedding and collection tests concurrently.
+    
+    One only talks to Gemini and the other only to Qdrant, so their
+    network waits overlap (their output may interleave).
+    """
+    await asyncio.gather(
+        asyncio.to_thread(test_embedding_service),
+        asyncio.to_thread(test_vectorstore_connection),
+    )
 
 
 if __name__ == "__main__":
@@ -145,8 +200,8 @@ if __name__ == "__main__":
     print()
     
     try:
-        test_embedding_service()
-        test_vectorstore_connection()
+        asyncio.run(run_independent_tests())
+        # Upsert/search needs the recreated collection; delete needs the upsert
         test_upsert_and_search()
         test_delete_by_source()
         